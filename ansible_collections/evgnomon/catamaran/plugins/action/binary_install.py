@@ -0,0 +1,159 @@
+import os
+import secrets
+
+from ansible.errors import AnsibleActionFail
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.plugins.action import ActionBase
+from catamaran import artifacts
+
+MODULE = "evgnomon.catamaran.binary_install"
+
+
+class ActionModule(ActionBase):
+    TRANSFERS_FILES = True
+
+    _VALID_ARGS = frozenset(
+        (
+            "src",
+            "dest",
+            "mode",
+            "relay",
+            "relay_port",
+            "relay_ttl",
+            "relay_timeout",
+            "relay_address",
+            "location",
+        )
+    )
+
+    def _location(self, host, task_vars):
+        if host == task_vars["inventory_hostname"] and self._task.args.get("location"):
+            return self._task.args["location"]
+        return task_vars["hostvars"][host].get("z_location", "default")
+
+    def _relay_address(self, host, task_vars):
+        if host == task_vars["inventory_hostname"] and self._task.args.get("relay_address"):
+            return self._task.args["relay_address"]
+        return task_vars["hostvars"][host].get("z_private_ip") or None
+
+    def _relay_seed(self, location, task_vars):
+        for host in task_vars.get("ansible_play_hosts", []):
+            if self._location(host, task_vars) == location:
+                return host
+        return task_vars["inventory_hostname"]
+
+    def _remote_checksum(self, dest, task_vars):
+        stat = self._execute_module(
+            module_name="ansible.legacy.stat",
+            module_args=dict(
+                path=dest, follow=True, get_checksum=True, checksum_algorithm="sha256"
+            ),
+            task_vars=task_vars,
+        )
+        if stat.get("failed"):
+            raise AnsibleActionFail(f"Failed to stat {dest}: {stat.get('msg')}")
+        return stat["stat"].get("checksum") if stat["stat"]["exists"] else None
+
+    def _install(self, module_args, task_vars):
+        result = self._execute_module(
+            module_name=MODULE, module_args=module_args, task_vars=task_vars
+        )
+        if result.get("failed"):
+            raise AnsibleActionFail(result.get("msg", "binary_install failed"))
+        return result
+
+    def run(self, tmp=None, task_vars=None):
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp
+
+        args = self._task.args
+        src = args.get("src")
+        dest = args.get("dest")
+        if not src or not dest:
+            raise AnsibleActionFail("src and dest are required")
+
+        relay = boolean(args.get("relay", False), strict=False)
+        relay_port = int(args.get("relay_port", 8765))
+        relay_ttl = int(args.get("relay_ttl", 300))
+        relay_timeout = int(args.get("relay_timeout", 120))
+
+        try:
+            src = self._find_needle("files", os.path.expanduser(src))
+            checksum = artifacts.cached_digest(src)
+            dest = self._remote_expand_user(dest)
+            module_args = dict(dest=dest, checksum=checksum, mode=args.get("mode", "0755"))
+
+            host = task_vars["inventory_hostname"]
+            location = self._location(host, task_vars)
+            seed = self._relay_seed(location, task_vars) if relay else None
+            # Relays only listen on private addresses, never on ansible_host.
+            if seed and not self._relay_address(seed, task_vars):
+                if seed == host:
+                    self._display.warning(
+                        f"{host} has no private address, {location} is updated from the controller"
+                    )
+                seed = None
+            is_seed = seed == host
+            serve_args = {}
+            if is_seed:
+                token = secrets.token_urlsafe(24)
+                serve_args = dict(
+                    serve_address=self._relay_address(host, task_vars),
+                    serve_port=relay_port,
+                    serve_token=token,
+                    serve_ttl=relay_ttl,
+                )
+
+            result.update(checksum=checksum, source="none", bytes=0)
+            if self._remote_checksum(dest, task_vars) == checksum:
+                # Up to date seeds still serve the artifact to their peers.
+                if is_seed and not self._task.check_mode:
+                    self._install(dict(module_args, **serve_args), task_vars)
+                    artifacts.publish_relay(
+                        checksum, location, serve_args["serve_address"], token
+                    )
+                result["changed"] = False
+                result["msg"] = f"{dest} is up to date"
+                return result
+
+            if self._task.check_mode:
+                result["changed"] = True
+                return result
+
+            if seed and not is_seed:
+                found = artifacts.wait_relay(
+                    checksum, location, relay_timeout, relay_ttl
+                )
+                if found:
+                    address = found["address"]
+                    try:
+                        self._install(
+                            dict(
+                                module_args,
+                                relay_url=f"http://{address}:{relay_port}/{found['token']}/{checksum}.gz",
+                            ),
+                            task_vars,
+                        )
+                        result.update(changed=True, source="relay", relay=address)
+                        return result
+                    except AnsibleActionFail as e:
+                        self._display.warning(
+                            f"Relay {address} failed, falling back to the controller: {e}"
+                        )
+
+            blob = artifacts.compressed(src, checksum)
+            tmp_src = self._connection._shell.join_path(
+                self._connection._shell.tmpdir, "source.gz"
+            )
+            self._transfer_file(blob, tmp_src)
+            self._fixup_perms2((self._connection._shell.tmpdir, tmp_src))
+            self._install(dict(module_args, src=tmp_src, **serve_args), task_vars)
+            if is_seed:
+                artifacts.publish_relay(checksum, location, serve_args["serve_address"], token)
+            result.update(changed=True, source="controller", bytes=os.path.getsize(blob))
+            return result
+        finally:
+            self._remove_tmp_path(self._connection._shell.tmpdir)
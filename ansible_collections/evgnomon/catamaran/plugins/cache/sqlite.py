@@ -0,0 +1,71 @@
+from ansible.plugins.cache import BaseCacheModule
+from catamaran.factcache import FactCache
+
+DOCUMENTATION = r"""
+---
+name: sqlite
+short_description: Persist Ansible facts in a local SQLite file
+description:
+  - Stores the facts of every host in a single SQLite file on the controller.
+  - Each host entry carries its own TTL, so fresh hosts can skip fact gathering
+    while stale ones are refreshed (see the C(z_facts) role).
+  - Entries can be invalidated or given a custom TTL with the
+    C(evgnomon.catamaran.fact_cache) module.
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+options:
+  _uri:
+    description:
+      - Path of the SQLite file. A directory is accepted and gets C(facts.db) appended.
+    default: ~/.cache/catamaran/facts.db
+    env:
+      - name: ANSIBLE_CACHE_PLUGIN_CONNECTION
+    ini:
+      - key: fact_caching_connection
+        section: defaults
+    type: path
+  _timeout:
+    description:
+      - Default TTL in seconds of new entries. C(0) never expires.
+    default: 86400
+    env:
+      - name: ANSIBLE_CACHE_PLUGIN_TIMEOUT
+    ini:
+      - key: fact_caching_timeout
+        section: defaults
+    type: integer
+"""
+
+
+class CacheModule(BaseCacheModule):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._db = FactCache(self.get_option("_uri"), ttl=self.get_option("_timeout"))
+        # Facts fresh at gather time stay available for the rest of the run.
+        self._cache = {}
+
+    def get(self, key):
+        if key not in self._cache:
+            value = self._db.get(key)
+            if value is None:
+                raise KeyError(key)
+            self._cache[key] = value
+        return self._cache[key]
+
+    def set(self, key, value):
+        self._cache[key] = value
+        self._db.set(key, value)
+
+    def keys(self):
+        return self._db.keys()
+
+    def contains(self, key):
+        return key in self._cache or self._db.contains(key)
+
+    def delete(self, key):
+        self._cache.pop(key, None)
+        self._db.delete(key)
+
+    def flush(self):
+        self._cache = {}
+        self._db.flush()
@@ -0,0 +1,32 @@
+from ansible.plugins.callback import CallbackBase
+from catamaran.agent import AgentError, call
+
+DOCUMENTATION = r"""
+---
+name: agent
+type: aggregate
+short_description: Stop the catamaran agent at the end of a playbook
+description:
+  - Modules started with C(CATAMARAN_AGENT=1) delegate to an agent on the
+    controller that keeps HTTP connections, the Docker connection, registry
+    logins and DNS lookups warm between tasks.
+  - This callback asks the agent to exit once the playbook ends instead of
+    waiting for C(CATAMARAN_AGENT_IDLE) seconds without requests.
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+requirements:
+  - Enable in the C(callbacks_enabled) setting.
+"""
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "aggregate"
+    CALLBACK_NAME = "evgnomon.catamaran.agent"
+    CALLBACK_NEEDS_ENABLED = True
+
+    def v2_playbook_on_stats(self, stats):
+        try:
+            call("shutdown", timeout=5)
+        except (OSError, AgentError):
+            pass
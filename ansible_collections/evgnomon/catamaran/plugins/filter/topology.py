@@ -0,0 +1,8 @@
+from catamaran.topology import rolling_batches
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            "rolling_batches": rolling_batches,
+        }
@@ -0,0 +1,10 @@
+from catamaran.tuning import parse_state, state_changes, tuning_profile
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            "tuning_profile": tuning_profile,
+            "tuning_state": parse_state,
+            "tuning_changes": state_changes,
+        }
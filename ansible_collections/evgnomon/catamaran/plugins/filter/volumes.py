@@ -0,0 +1,8 @@
+from catamaran.volumes import volume_plan
+
+
+class FilterModule(object):
+    def filters(self):
+        return {
+            "volume_plan": volume_plan,
+        }
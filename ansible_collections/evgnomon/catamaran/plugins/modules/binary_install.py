@@ -0,0 +1,272 @@
+#!/usr/bin/python
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.urls import open_url
+
+DOCUMENTATION = r"""
+---
+module: binary_install
+short_description: Install a binary from a controller artifact, skipping hosts that already have it
+description:
+  - Compares the sha256 of I(dest) with the artifact on the controller and does nothing when they match.
+  - Otherwise the artifact is sent gzip compressed and swapped in atomically.
+  - The controller side hashes and compresses the artifact once per version, not per host.
+  - With I(relay), the first host of every location is updated from the controller
+    and then serves the artifact to the other hosts of its location over HTTP.
+    Peers verify the checksum and fall back to the controller if the relay is not reachable.
+  - The relay only listens on the private address of the host and only serves the
+    artifact under a random path generated for the run, without directory listings.
+  - Hosts get their location from the C(z_location) variable set by C(z_nodes).
+  - This module is meant to be used through its action plugin; the remote part
+    only uses the Python standard library.
+options:
+  src:
+    description:
+      - Path of the artifact on the controller.
+    required: true
+    type: path
+  dest:
+    description:
+      - Path to install the binary to.
+    required: true
+    type: path
+  mode:
+    description:
+      - Permissions of the installed binary.
+    required: false
+    type: raw
+    default: '0755'
+  relay:
+    description:
+      - Let updated hosts serve the artifact to peers in the same location.
+    required: false
+    type: bool
+    default: false
+  relay_port:
+    description:
+      - Port the relay hosts serve the artifact on. It must be reachable between peers.
+    required: false
+    type: int
+    default: 8765
+  relay_ttl:
+    description:
+      - Seconds a relay keeps serving.
+    required: false
+    type: int
+    default: 300
+  relay_timeout:
+    description:
+      - Seconds a peer waits for the relay of its location before using the controller.
+    required: false
+    type: int
+    default: 120
+  relay_address:
+    description:
+      - Private address the relay of the host listens on and its peers connect to.
+        Defaults to C(z_private_ip). Locations whose relay host has no private
+        address are updated from the controller.
+    required: false
+    type: str
+  location:
+    description:
+      - Location of the host. Defaults to C(z_location) or C(default).
+    required: false
+    type: str
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Install zcore
+  evgnomon.catamaran.binary_install:
+    src: "{{ workspace }}/dist/zcore-linux-amd64"
+    dest: /usr/bin/zcore
+    mode: "0755"
+    relay: true
+"""
+
+RETURN = r"""
+checksum:
+  description: sha256 of the artifact.
+  type: str
+  returned: always
+source:
+  description: Where the binary came from, C(none) if the host already had it, C(controller) or C(relay).
+  type: str
+  returned: always
+relay:
+  description: Address of the host the binary was fetched from.
+  type: str
+  returned: when source is relay
+bytes:
+  description: Compressed bytes sent to the host.
+  type: int
+  returned: always
+"""
+
+CHUNK_SIZE = 1 << 20
+
+
+def parse_mode(mode):
+    if isinstance(mode, int):
+        return mode
+    return int(str(mode), 8)
+
+
+def unpack(module, stream, dest, checksum):
+    """Decompress ``stream`` next to ``dest`` and verify it, returning the temp path."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".binary_install.")
+    with os.fdopen(fd, "wb") as out, gzip.GzipFile(fileobj=stream) as f:
+        shutil.copyfileobj(f, out, CHUNK_SIZE)
+    actual = module.sha256(tmp)
+    if actual != checksum:
+        os.unlink(tmp)
+        module.fail_json(msg=f"Checksum mismatch: expected {checksum}, got {actual}")
+    return tmp
+
+
+def ensure_relay_blob(src, dest, relay_dir, checksum):
+    os.makedirs(relay_dir, mode=0o700, exist_ok=True)
+    blob = os.path.join(relay_dir, f"{checksum}.gz")
+    if os.path.exists(blob):
+        return blob
+    tmp = f"{blob}.{os.getpid()}"
+    if src:
+        shutil.copyfile(src, tmp)
+    else:
+        with open(dest, "rb") as f, gzip.open(tmp, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(f, out, CHUNK_SIZE)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, blob)
+    return blob
+
+
+def relay_handler(blob, token):
+    """Handler serving ``blob`` under ``/<token>/<name>`` only."""
+    path = f"/{token}/{os.path.basename(blob)}"
+
+    class RelayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send(body=True)
+
+        def do_HEAD(self):
+            self.send(body=False)
+
+        def send(self, body):
+            if self.path != path:
+                self.send_error(404)
+                return
+            with open(blob, "rb") as f:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/gzip")
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                self.end_headers()
+                if body:
+                    shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+        def log_message(self, format, *args):
+            pass
+
+    return RelayHandler
+
+
+def serve(blob, address, port, token, ttl):
+    """Serve ``blob`` on ``address`` from a detached process for ``ttl`` seconds."""
+    if os.fork():
+        return
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    try:
+        server = ThreadingHTTPServer((address, port), relay_handler(blob, token))
+    except OSError:
+        # A relay from an earlier run still holds the port.
+        os._exit(0)
+    threading.Timer(ttl, server.shutdown).start()
+    server.serve_forever()
+    os._exit(0)
+
+
+def run_module():
+    module_args = dict(
+        dest=dict(type="path", required=True),
+        checksum=dict(type="str", required=True),
+        mode=dict(type="raw", default="0755"),
+        src=dict(type="path", required=False),
+        relay_url=dict(type="str", required=False),
+        relay_dir=dict(type="path", default="/var/cache/catamaran/relay"),
+        serve_port=dict(type="int", required=False),
+        serve_address=dict(type="str", required=False),
+        serve_token=dict(type="str", required=False, no_log=True),
+        serve_ttl=dict(type="int", default=300),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_by={"serve_port": ("serve_address", "serve_token")},
+    )
+
+    dest = module.params["dest"]
+    checksum = module.params["checksum"]
+    mode = parse_mode(module.params["mode"])
+    src = module.params["src"]
+    relay_url = module.params["relay_url"]
+
+    result = dict(changed=False, checksum=checksum, serving=False)
+
+    current = module.sha256(dest) if os.path.exists(dest) else None
+    if current != checksum:
+        result["changed"] = True
+        if module.check_mode:
+            module.exit_json(**result)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            if relay_url:
+                stream = open_url(relay_url, timeout=60)
+            elif src:
+                stream = open(src, "rb")
+            else:
+                module.fail_json(msg=f"{dest} is out of date and no source was given")
+            with stream:
+                tmp = unpack(module, stream, dest, checksum)
+        except Exception as e:
+            module.fail_json(msg=f"Failed to fetch the binary: {str(e)}", **result)
+        os.chmod(tmp, mode)
+        module.atomic_move(tmp, dest)
+    elif (os.stat(dest).st_mode & 0o7777) != mode and not module.check_mode:
+        os.chmod(dest, mode)
+        result["changed"] = True
+
+    if module.params["serve_port"] and not module.check_mode:
+        blob = ensure_relay_blob(src, dest, module.params["relay_dir"], checksum)
+        sys.stdout.flush()
+        serve(
+            blob,
+            module.params["serve_address"],
+            module.params["serve_port"],
+            module.params["serve_token"],
+            module.params["serve_ttl"],
+        )
+        result["serving"] = True
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.bootstrap import wait_for_endpoints
+
+DOCUMENTATION = r"""
+---
+module: cluster_barrier
+short_description: Wait until a set of cluster endpoints all accept connections
+description:
+  - Polls every endpoint in one aggregated loop, checking the pending ones concurrently.
+  - Returns once all endpoints are up, or fails after I(timeout).
+  - Meant to run once on the controller between bootstrap phases, e.g.
+    to hold replicas back until every shard primary is up.
+options:
+  endpoints:
+    description:
+      - Endpoints in the C(host:port) format.
+    required: true
+    type: list
+    elements: str
+  timeout:
+    description:
+      - Seconds to wait for all endpoints.
+    required: false
+    type: int
+    default: 300
+  interval:
+    description:
+      - Seconds between polling rounds.
+    required: false
+    type: float
+    default: 2
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Wait for every shard primary
+  evgnomon.catamaran.cluster_barrier:
+    endpoints:
+      - shard-a.example.com:3306
+      - shard-a-1.example.com:3306
+  delegate_to: localhost
+  run_once: true
+"""
+
+RETURN = r"""
+ready:
+  description: Seconds until each endpoint was up.
+  type: dict
+  returned: always
+pending:
+  description: Endpoints that were still down at the timeout.
+  type: list
+  returned: always
+seconds:
+  description: Time spent waiting.
+  type: float
+  returned: always
+metrics:
+  description: Run time and peak RSS of the module.
+  type: dict
+  returned: always
+"""
+
+
+def run_module():
+    module_args = dict(
+        endpoints=dict(type="list", elements="str", required=True),
+        timeout=dict(type="int", default=300),
+        interval=dict(type="float", default=2),
+    )
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    result = AnsibleResult()
+    instrument(module, result.metrics)
+
+    try:
+        barrier = wait_for_endpoints(
+            module.params["endpoints"],
+            timeout=module.params["timeout"],
+            interval=module.params["interval"],
+        )
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+
+    if barrier.pending:
+        module.fail_json(
+            msg=f"Endpoints not ready after {barrier.seconds}s: {', '.join(barrier.pending)}",
+            **barrier.to_dict(),
+        )
+
+    result.msg = f"{len(barrier.ready)} endpoints ready after {barrier.seconds}s"
+    module.exit_json(**result.to_dict(), **barrier.to_dict())
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
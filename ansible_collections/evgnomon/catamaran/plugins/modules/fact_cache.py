@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.factcache import FactCache
+
+DOCUMENTATION = r"""
+---
+module: fact_cache
+short_description: Inspect and invalidate the catamaran SQLite fact cache
+description:
+  - Operates on the file used by the C(evgnomon.catamaran.sqlite) cache plugin.
+  - C(absent) drops the cached facts of the given hosts, e.g. after they were re-provisioned.
+  - C(present) sets a per-host TTL on the cached entries of the given hosts.
+  - C(query) reports which of the given hosts have fresh or stale facts.
+  - Runs on the controller; use C(delegate_to: localhost) from remote plays.
+options:
+  hosts:
+    description:
+      - Inventory hostnames to operate on.
+    required: true
+    type: list
+    elements: str
+  state:
+    description:
+      - What to do with the cached entries of I(hosts).
+    required: false
+    type: str
+    default: query
+    choices: ['absent', 'present', 'query']
+  ttl:
+    description:
+      - TTL in seconds to set on the entries with C(state=present). C(0) never expires.
+    required: false
+    type: int
+  path:
+    description:
+      - Path of the SQLite file.
+      - Defaults to C(ANSIBLE_CACHE_PLUGIN_CONNECTION) or C(~/.cache/catamaran/facts.db).
+      - Modules do not see C(fact_caching_connection) of C(ansible.cfg), pass
+        C({{ lookup('ansible.builtin.config', 'CACHE_PLUGIN_CONNECTION') }}) to use
+        the file of the cache plugin.
+    required: false
+    type: path
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Forget facts of re-provisioned hosts
+  evgnomon.catamaran.fact_cache:
+    hosts:
+      - shard-a.example.com
+    state: absent
+    path: "{{ lookup('ansible.builtin.config', 'CACHE_PLUGIN_CONNECTION') }}"
+
+- name: Keep facts of long lived hosts for a week
+  evgnomon.catamaran.fact_cache:
+    hosts: "{{ groups['shards'] }}"
+    state: present
+    ttl: 604800
+
+- name: List hosts that need fact gathering
+  evgnomon.catamaran.fact_cache:
+    hosts: "{{ ansible_play_hosts_all }}"
+  register: facts_state
+"""
+
+RETURN = r"""
+fresh:
+  description: Hosts from I(hosts) with fresh cached facts.
+  type: list
+  returned: always
+stale:
+  description: Hosts from I(hosts) without fresh cached facts.
+  type: list
+  returned: always
+keys:
+  description: Cache keys removed or updated.
+  type: list
+  returned: always
+metrics:
+  description: Run time and peak RSS of the module.
+  type: dict
+  returned: always
+"""
+
+
+def run_module():
+    module_args = dict(
+        hosts=dict(type="list", elements="str", required=True),
+        state=dict(type="str", default="query", choices=["absent", "present", "query"]),
+        ttl=dict(type="int", required=False),
+        path=dict(type="path", required=False),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_if=[("state", "present", ["ttl"])],
+    )
+    result = AnsibleResult()
+    instrument(module, result.metrics)
+
+    hosts = module.params["hosts"]
+    state = module.params["state"]
+
+    cache = FactCache(module.params["path"])
+    try:
+        keys = []
+        if state == "absent":
+            keys = cache.keys_of(hosts)
+            if keys and not module.check_mode:
+                cache.invalidate(hosts)
+            result.changed = bool(keys)
+            result.msg = f"Invalidated {len(keys)} cached entries"
+        elif state == "present":
+            keys = cache.keys_of(hosts)
+            if keys and not module.check_mode:
+                cache.set_ttl(hosts, module.params["ttl"])
+            result.changed = bool(keys)
+            result.msg = f"Set TTL on {len(keys)} cached entries"
+
+        stale = cache.stale(hosts)
+        fresh = [host for host in hosts if host not in stale]
+    finally:
+        cache.close()
+
+    module.exit_json(**result.to_dict(), fresh=fresh, stale=stale, keys=keys)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,12 @@
 
 import asyncio
 import os
-import platform
-import docker
-from docker.errors import APIError
 from ansible.module_utils.basic import AnsibleModule
 from catamaran.github import GithubEnvVars
-from catamaran.ansible import AnsibleResult
-from catamaran import delete_image
+from catamaran.agent import delegate
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.ghcr import delete_image
+from catamaran.textfile import recorded
 
 # Documentation for Ansible Galaxy
 DOCUMENTATION = """
@@ -94,6 +93,11 @@ result:
     skipped:
       description: Whether the operation was skipped
       type: bool
+    metrics:
+      description:
+        - Time spent in the C(login), C(context), C(build), C(push) and
+          C(delete) phases, C(pushed_bytes) and the peak RSS of the module.
+      type: dict
 """
 
 
@@ -114,6 +118,7 @@ async def run_module():
     env_vars = GithubEnvVars()
 
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    metrics = instrument(module, result.metrics)
 
     image_name = module.params["image"]
     owner = module.params["owner"]
@@ -126,11 +131,8 @@ async def run_module():
 
     tag = tag.replace("/", "-")
 
-    docker_sock = os.getenv("DOCKER_SOCK", get_docker_socket())
-    docker_client = docker.APIClient(base_url=docker_sock)
+    docker_client = None
     try:
-        # Initialize Docker client with Unix socket
-
         # Construct full image name
         full_image_name = f"ghcr.io/{owner}/{image_name}:{tag}"
 
@@ -139,9 +141,40 @@ async def run_module():
                 result.msg = f"Would build and push image {full_image_name}"
                 module.exit_json(**result.to_dict())
 
+            repository = f"ghcr.io/{owner}/{image_name}"
+            publish = bool(module.params.get("publish"))
+            delegated = delegate(
+                "build_image",
+                image=full_image_name,
+                context=os.path.abspath(context),
+                dockerfile=dockerfile,
+                username=actor,
+                token=token,
+                registry="ghcr.io",
+                repository=repository if publish else None,
+                tag=tag,
+            )
+            if delegated is not None:
+                metrics.merge(delegated["metrics"])
+                result.changed = True
+                result.msg = (
+                    f"Successfully built and pushed {full_image_name}"
+                    if publish
+                    else f"Building image {full_image_name}"
+                )
+                module.exit_json(**result.to_dict())
+
+            # docker is only needed to build, deleting goes through the API
+            from docker.errors import APIError
+            from catamaran import registry
+
+            # Initialize Docker client with Unix socket
+            docker_client = registry.docker_client()
+
             # Login to GitHub Container Registry
             try:
-                docker_client.login(username=actor, password=token, registry="ghcr.io")
+                with metrics.phase("login"):
+                    docker_client.login(username=actor, password=token, registry="ghcr.io")
             except APIError as e:
                 module.fail_json(
                     msg=f"Failed to login to ghcr.io: {str(e)}. Ensure the token has correct permissions."
@@ -150,36 +183,24 @@ async def run_module():
             # Build Docker image
             try:
                 result.msg = f"Building image {full_image_name}"
-                build_logs = docker_client.build(
-                    path=context,
-                    dockerfile=dockerfile,
-                    tag=full_image_name,
-                    rm=True,
-                    pull=True,
-                    decode=True,
+                registry.build_image(
+                    docker_client, full_image_name, context, dockerfile, metrics
                 )
-                for line in build_logs:
-                    if "error" in line:
-                        module.fail_json(msg=f"Build error: {line.get('error')}")
                 result.changed = True
+            except RuntimeError as e:
+                module.fail_json(msg=str(e))
             except APIError as e:
                 module.fail_json(msg=f"Failed to build image: {str(e)}")
 
             # Push image to GitHub Packages
-            if module.params.get("publish"):
+            if publish:
                 try:
                     result.msg = f"Pushing image {full_image_name}"
-                    push_logs = docker_client.push(
-                        repository=f"ghcr.io/{owner}/{image_name}",
-                        tag=tag,
-                        stream=True,
-                        decode=True,
-                    )
-                    for line in push_logs:
-                        if "error" in line:
-                            module.fail_json(msg=f"Push error: {line.get('error')}")
+                    registry.push_image(docker_client, repository, tag, metrics)
                     result.changed = True
                     result.msg = f"Successfully built and pushed {full_image_name}"
+                except RuntimeError as e:
+                    module.fail_json(msg=str(e))
                 except APIError as e:
                     module.fail_json(
                         msg=f"Failed to push image: {str(e)}. Ensure the token has 'write:packages' scope."
@@ -198,12 +219,19 @@ async def run_module():
                 result.msg = f"Would delete image {full_image_name}"
                 module.exit_json(**result.to_dict())
 
-            await delete_image(
-                tag,
-                image_name,
-                actor,
-                token=token,
+            delegated = delegate(
+                "delete_image", tag=tag, image_name=image_name, username=actor, token=token
             )
+            if delegated is not None:
+                metrics.merge(delegated["metrics"])
+            else:
+                with metrics.phase("delete"):
+                    await delete_image(
+                        tag,
+                        image_name,
+                        actor,
+                        token=token,
+                    )
             result.msg = f"Image {full_image_name} deleted."
             result.changed = True
 
@@ -217,20 +245,8 @@ async def run_module():
 
 
 async def main():
-    await run_module()
-
-
-def get_docker_socket():
-    system = platform.system().lower()
-    if system == "windows":
-        return "npipe:////./pipe/docker_engine"
-    elif system == "linux":
-        return "unix:///var/run/docker.sock"
-    elif system == "darwin":
-        home_path = os.getenv("HOME")
-        return f"unix://{home_path}/.docker/run/docker.sock"
-    else:
-        raise RuntimeError(f"Unsupported OS: {system}")
+    with recorded("gh_image"):
+        await run_module()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.registry import prefetch
+
+DOCUMENTATION = r"""
+---
+module: image_prefetch
+short_description: Pull container images only when their registry digest changed
+description:
+  - Logs in to the registry once, then compares the local digest of every image
+    with the digest published in the registry.
+  - Only images that are missing or out of date are pulled, concurrently.
+  - Reports the bytes fetched and the time spent for each image.
+options:
+  images:
+    description:
+      - Image references to prefetch, e.g. C(mysql:8.0.33).
+    required: true
+    type: list
+    elements: str
+  username:
+    description:
+      - Registry user to log in as.
+    required: false
+    type: str
+  password:
+    description:
+      - Registry password or token.
+    required: false
+    type: str
+  registry:
+    description:
+      - Registry the credentials belong to. Images from other registries are pulled anonymously.
+    required: false
+    type: str
+    default: ghcr.io
+  parallel:
+    description:
+      - Maximum number of concurrent pulls.
+    required: false
+    type: int
+    default: 4
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Prefetch zygote images
+  evgnomon.catamaran.image_prefetch:
+    images:
+      - mysql:8.0.33
+      - redis:7.0.11
+      - ghcr.io/evgnomon/ark:main
+    username: "{{ secrets.docker_login.user }}"
+    password: "{{ z_user_token }}"
+"""
+
+RETURN = r"""
+images:
+  description: Per image report.
+  type: list
+  returned: always
+  contains:
+    image:
+      description: Image reference.
+      type: str
+    pulled:
+      description: Whether the image was (or in check mode would be) pulled.
+      type: bool
+    local_digest:
+      description: Digest of the local image before pulling.
+      type: str
+    remote_digest:
+      description: Digest published in the registry.
+      type: str
+    bytes:
+      description: Layer bytes fetched.
+      type: int
+    seconds:
+      description: Time spent on the image.
+      type: float
+    error:
+      description: Error message if the image could not be prefetched.
+      type: str
+metrics:
+  description: A C(pull <image>) phase per image, C(pulled_bytes) and the peak RSS.
+  type: dict
+  returned: always
+"""
+
+
+def run_module():
+    module_args = dict(
+        images=dict(type="list", elements="str", required=True),
+        username=dict(type="str", required=False),
+        password=dict(type="str", required=False, no_log=True),
+        registry=dict(type="str", default="ghcr.io"),
+        parallel=dict(type="int", default=4),
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_together=[("username", "password")],
+    )
+    result = AnsibleResult()
+    instrument(module, result.metrics)
+
+    try:
+        reports = prefetch(
+            module.params["images"],
+            username=module.params["username"],
+            password=module.params["password"],
+            registry=module.params["registry"],
+            parallel=module.params["parallel"],
+            check_only=module.check_mode,
+        )
+    except Exception as e:
+        module.fail_json(msg=f"Error: {str(e)}")
+
+    for r in reports:
+        result.metrics.record(f"pull {r.image}", r.seconds)
+        result.metrics.count("pulled_bytes", r.bytes)
+    pulled = [r.image for r in reports if r.pulled and not r.error]
+    failed = [r.image for r in reports if r.error]
+    result.changed = bool(pulled)
+    images = [r.to_dict() for r in reports]
+    if failed:
+        result.failed = True
+        result.msg = f"Failed to prefetch {', '.join(failed)}"
+        module.fail_json(**result.to_dict(), images=images)
+    result.msg = f"Pulled {len(pulled)} of {len(reports)} images"
+    module.exit_json(**result.to_dict(), images=images)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
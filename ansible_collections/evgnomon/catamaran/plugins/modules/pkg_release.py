@@ -4,9 +4,30 @@ from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.urls import fetch_url
 from ansible.module_utils._text import to_text
 
+from contextlib import nullcontext
 import json
 import os
 
+try:
+    # Runs are timed and recorded for node_exporter where catamaran is installed.
+    from catamaran.ansible import instrument
+    from catamaran.textfile import recorded
+except ImportError:
+
+    class _Metrics:
+        def phase(self, name):
+            return nullcontext()
+
+        def count(self, name, value=1):
+            pass
+
+    def instrument(module):
+        return _Metrics()
+
+    def recorded(task):
+        return nullcontext()
+
+
 DOCUMENTATION = r"""
 ---
 module: pkg_release
@@ -85,6 +106,11 @@ release:
 assets:
   description: Information about the uploaded assets.
   type: list
+metrics:
+  description:
+    - Time spent listing releases and assets, creating the release and in an
+      C(upload <name>) phase per asset, C(uploaded_bytes) and the peak RSS.
+  type: dict
 """
 
 
@@ -109,7 +135,7 @@ def handle_response(response, info, module, success_status_codes=[200]):
             return body
 
 
-def main():
+def run_module():
     argument_spec = dict(
         github_token=dict(type="str", no_log=True),
         repo=dict(type="str", required=True),
@@ -124,6 +150,7 @@ def main():
         argument_spec=argument_spec,
         supports_check_mode=True,
     )
+    metrics = instrument(module)
 
     github_token = module.params["github_token"] or os.getenv("GITHUB_PAT")
     if not github_token:
@@ -164,8 +191,9 @@ def main():
 
     try:
         # Fetch existing releases
-        response, info = fetch_url(module, release_url, headers=headers)
-        releases = handle_response(response, info, module)
+        with metrics.phase("list_releases"):
+            response, info = fetch_url(module, release_url, headers=headers)
+            releases = handle_response(response, info, module)
 
         # Check for existing release
         existing_release = next(
@@ -176,8 +204,9 @@ def main():
             release = existing_release
             # Get existing assets
             assets_url = release["assets_url"]
-            response, info = fetch_url(module, assets_url, headers=headers)
-            existing_assets = handle_response(response, info, module)
+            with metrics.phase("list_assets"):
+                response, info = fetch_url(module, assets_url, headers=headers)
+                existing_assets = handle_response(response, info, module)
             existing_asset_names = [asset["name"] for asset in existing_assets]
 
             assets_to_upload = []
@@ -201,17 +230,19 @@ def main():
                         binary_data = binary_file.read()
                     upload_headers = headers.copy()
                     upload_headers["Content-Type"] = "application/octet-stream"
-                    response, info = fetch_url(
-                        module,
-                        upload_url_with_params,
-                        data=binary_data,
-                        headers=upload_headers,
-                        method="POST",
-                        timeout=300,
-                    )
-                    upload_response = handle_response(
-                        response, info, module, success_status_codes=[201]
-                    )
+                    with metrics.phase(f"upload {binary_filename}"):
+                        response, info = fetch_url(
+                            module,
+                            upload_url_with_params,
+                            data=binary_data,
+                            headers=upload_headers,
+                            method="POST",
+                            timeout=300,
+                        )
+                        upload_response = handle_response(
+                            response, info, module, success_status_codes=[201]
+                        )
+                    metrics.count("uploaded_bytes", len(binary_data))
                     uploaded_assets.append(upload_response)
                 result["changed"] = True
                 result["message"] = "Assets uploaded successfully."
@@ -232,12 +263,13 @@ def main():
                 "prerelease": prerelease,
             }
             data = json.dumps(release_data).encode("utf-8")
-            response, info = fetch_url(
-                module, release_url, data=data, headers=headers, method="POST"
-            )
-            release = handle_response(
-                response, info, module, success_status_codes=[201]
-            )
+            with metrics.phase("create_release"):
+                response, info = fetch_url(
+                    module, release_url, data=data, headers=headers, method="POST"
+                )
+                release = handle_response(
+                    response, info, module, success_status_codes=[201]
+                )
 
             # Upload assets
             upload_url = release["upload_url"].replace("{?name,label}", "")
@@ -250,17 +282,19 @@ def main():
                     binary_data = binary_file.read()
                 upload_headers = headers.copy()
                 upload_headers["Content-Type"] = "application/octet-stream"
-                response, info = fetch_url(
-                    module,
-                    upload_url_with_params,
-                    data=binary_data,
-                    headers=upload_headers,
-                    method="POST",
-                    timeout=300,
-                )
-                upload_response = handle_response(
-                    response, info, module, success_status_codes=[201]
-                )
+                with metrics.phase(f"upload {binary_filename}"):
+                    response, info = fetch_url(
+                        module,
+                        upload_url_with_params,
+                        data=binary_data,
+                        headers=upload_headers,
+                        method="POST",
+                        timeout=300,
+                    )
+                    upload_response = handle_response(
+                        response, info, module, success_status_codes=[201]
+                    )
+                metrics.count("uploaded_bytes", len(binary_data))
                 uploaded_assets.append(upload_response)
             result["changed"] = True
             result["message"] = "Release created and assets uploaded successfully."
@@ -273,5 +307,10 @@ def main():
     module.exit_json(**result)
 
 
+def main():
+    with recorded("pkg_release"):
+        run_module()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+import os
+
+from ansible.module_utils.basic import AnsibleModule
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.releases import ReleaseFetcher
+
+DOCUMENTATION = r"""
+---
+module: release_binary
+short_description: Install a binary from the latest GitHub release with a local cache
+description:
+  - Resolves the latest release of a repository through the GitHub API using
+    conditional requests, so an unchanged release costs a C(304) response.
+  - Picks the single asset whose name contains every I(match) pattern.
+  - Keeps a content addressed cache keyed by asset ID and digest. The asset is
+    streamed to disk and verified against the digest published by GitHub.
+  - The binary is swapped in atomically and only when its content changed.
+options:
+  repo:
+    description:
+      - GitHub repository in the format C(owner/repo).
+    required: true
+    type: str
+  match:
+    description:
+      - Substrings the asset name must contain. Prefix with C(^) to exclude.
+    required: true
+    type: list
+    elements: str
+  dest:
+    description:
+      - Path to install the binary to.
+    required: true
+    type: path
+  mode:
+    description:
+      - Permissions of the installed binary.
+    required: false
+    type: str
+    default: '0755'
+  token:
+    description:
+      - GitHub token, needed for private repositories and higher rate limits.
+    required: false
+    type: str
+  cache_dir:
+    description:
+      - Directory of the release cache.
+    required: false
+    type: path
+    default: ~/.cache/catamaran/releases
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Install zygote
+  evgnomon.catamaran.release_binary:
+    repo: evgnomon/zygote
+    match:
+      - zygote-
+      - "{{ z_os }}"
+      - "{{ z_arch }}"
+    dest: "{{ ansible_env.HOME }}/.local/bin/zygote"
+    token: "{{ z_user_token }}"
+"""
+
+RETURN = r"""
+tag:
+  description: Tag of the resolved release.
+  type: str
+  returned: success
+asset:
+  description: Name of the selected asset.
+  type: str
+  returned: success
+asset_id:
+  description: ID of the selected asset.
+  type: int
+  returned: success
+digest:
+  description: Digest of the asset.
+  type: str
+  returned: success
+downloaded:
+  description: Whether the asset was downloaded instead of served from the cache.
+  type: bool
+  returned: success
+installed:
+  description: Whether I(dest) was replaced.
+  type: bool
+  returned: success
+metrics:
+  description:
+    - Time spent in the C(release), C(download) and C(install) phases,
+      C(downloaded_bytes) and the peak RSS.
+  type: dict
+  returned: always
+"""
+
+
+def run_module():
+    module_args = dict(
+        repo=dict(type="str", required=True),
+        match=dict(type="list", elements="str", required=True),
+        dest=dict(type="path", required=True),
+        mode=dict(type="str", default="0755"),
+        token=dict(type="str", required=False, no_log=True),
+        cache_dir=dict(type="path", default="~/.cache/catamaran/releases"),
+    )
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    result = AnsibleResult()
+    instrument(module, result.metrics)
+
+    fetcher = ReleaseFetcher(
+        token=module.params["token"] or os.getenv("GITHUB_TOKEN"),
+        cache_dir=module.params["cache_dir"],
+        metrics=result.metrics,
+    )
+    try:
+        fetched = fetcher.fetch(
+            module.params["repo"],
+            [p for p in module.params["match"] if p],
+            module.params["dest"],
+            mode=int(module.params["mode"], 8),
+            dry_run=module.check_mode,
+        )
+    except Exception as e:
+        module.fail_json(msg=f"Error: {str(e)}")
+    finally:
+        fetcher.close()
+
+    result.changed = fetched.installed
+    result.msg = (
+        f"Installed {fetched.asset} from {fetched.tag}"
+        if fetched.installed
+        else f"{fetched.path} is up to date with {fetched.tag}"
+    )
+    module.exit_json(**result.to_dict(), **fetched.to_dict())
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
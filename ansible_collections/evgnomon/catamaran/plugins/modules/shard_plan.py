@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.topology import DEFAULT_BUCKETS, plan_shards
+
+DOCUMENTATION = r"""
+---
+module: shard_plan
+short_description: Plan a minimal-movement change of the shard count
+description:
+  - Places a fixed number of hash buckets onto shards with rendezvous hashing,
+    so changing the shard count only moves the buckets won by new shards or
+    owned by removed ones.
+  - Compares the placement for I(previous_num_shards) with the one for
+    I(num_shards) and returns the bucket moves and an action per replica host.
+  - Host names follow C(z_add_shards), e.g. C(shard-b-2.example.com).
+  - Pure computation, it does not touch any host.
+options:
+  domain:
+    description:
+      - Domain of the shard hosts.
+    required: true
+    type: str
+  num_shards:
+    description:
+      - Target number of shards.
+    required: true
+    type: int
+  shard_size:
+    description:
+      - Number of replicas of every shard.
+    required: true
+    type: int
+  previous_num_shards:
+    description:
+      - Number of shards currently deployed. When omitted every host is planned to C(join).
+    required: false
+    type: int
+  node_type:
+    description:
+      - Node type prefix of the host names.
+    required: false
+    type: str
+    default: shard
+  buckets:
+    description:
+      - Number of hash buckets placed onto shards.
+    required: false
+    type: int
+    default: 1024
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Plan growing from 3 to 4 shards
+  evgnomon.catamaran.shard_plan:
+    domain: "{{ z_domain }}"
+    num_shards: 4
+    previous_num_shards: 3
+    shard_size: 3
+  delegate_to: localhost
+  run_once: true
+  register: plan
+
+- set_fact:
+    z_shard_plan: "{{ plan.hosts[inventory_hostname] }}"
+"""
+
+RETURN = r"""
+moved_buckets:
+  description: Number of buckets that change shard.
+  type: int
+  returned: always
+moves:
+  description: Buckets moving between shard pairs, as C(from), C(to) and C(buckets).
+  type: list
+  returned: always
+hosts:
+  description:
+    - Plan per host with C(shard), C(replica), C(buckets), C(buckets_in), C(buckets_out)
+      and C(action), one of C(join), C(rebalance), C(keep) or C(leave).
+  type: dict
+  returned: always
+metrics:
+  description: Run time and peak RSS of the module.
+  type: dict
+  returned: always
+"""
+
+
+def run_module():
+    module_args = dict(
+        domain=dict(type="str", required=True),
+        num_shards=dict(type="int", required=True),
+        shard_size=dict(type="int", required=True),
+        previous_num_shards=dict(type="int", required=False),
+        node_type=dict(type="str", default="shard"),
+        buckets=dict(type="int", default=DEFAULT_BUCKETS),
+    )
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    result = AnsibleResult()
+    instrument(module, result.metrics)
+
+    try:
+        plan = plan_shards(
+            module.params["domain"],
+            module.params["num_shards"],
+            module.params["shard_size"],
+            previous_num_shards=module.params["previous_num_shards"],
+            node_type=module.params["node_type"],
+            buckets=module.params["buckets"],
+        )
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+
+    result.msg = f"{plan.moved_buckets} of {module.params['buckets']} buckets move"
+    module.exit_json(**result.to_dict(), **plan.to_dict())
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,12 @@
 import socket
 from ansible.module_utils.basic import AnsibleModule
 
+try:
+    # Optional on the controller, lookups are cached by a running agent.
+    from catamaran.agent import AgentError, delegate
+except ImportError:
+    delegate = None
+
 DOCUMENTATION = r"""
 ---
 module: sign_cert
@@ -166,6 +172,13 @@ msg:
 
 def resolve_domain_ip(domain):
     """Resolve domain name to IP address using Python's socket module"""
+    if delegate is not None:
+        try:
+            resolved = delegate("resolve", host=domain)
+        except AgentError as e:
+            raise ValueError(f"DNS resolution failed for domain '{domain}': {e}")
+        if resolved is not None:
+            return resolved["address"]
     try:
         # Get all IP addresses for the domain
         ip_addresses = socket.getaddrinfo(
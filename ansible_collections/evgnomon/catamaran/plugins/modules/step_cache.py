@@ -0,0 +1,209 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.stepcache import Step, StepCache, run_steps
+
+DOCUMENTATION = r"""
+---
+module: step_cache
+short_description: Run build steps, restoring their outputs when the inputs are unchanged
+description:
+  - Hashes the declared inputs of every step, files matching its input
+    patterns, environment variables and tool versions, into a key.
+  - On a hit the outputs recorded for the key are restored from a content
+    addressed cache instead of running the command. Steps without outputs,
+    like checks, are skipped.
+  - On a miss the command runs and its outputs are stored. The least recently
+    used entries are evicted once the cache exceeds I(max_size).
+  - Independent steps run concurrently with I(parallel).
+options:
+  chdir:
+    description:
+      - Working directory of the steps, input and output patterns are relative to it.
+    required: true
+    type: path
+  steps:
+    description:
+      - Steps to run.
+    required: true
+    type: list
+    elements: dict
+    suboptions:
+      name:
+        description: Name of the step.
+        required: true
+        type: str
+      command:
+        description: Shell command of the step.
+        required: true
+        type: str
+      inputs:
+        description:
+          - fnmatch patterns of input files, C(*) also crosses directories.
+            Prefix with C(!) to exclude. Absolute patterns are globbed as is.
+        type: list
+        elements: str
+        default: []
+      outputs:
+        description: fnmatch patterns of the files the step produces.
+        type: list
+        elements: str
+        default: []
+      env:
+        description: Environment variables the outputs depend on.
+        type: list
+        elements: str
+        default: []
+      tools:
+        description: Commands printing the versions of the tools the step uses.
+        type: list
+        elements: str
+        default: []
+  parallel:
+    description:
+      - Run the steps concurrently. Sequential runs stop at the first failure.
+    required: false
+    type: bool
+    default: true
+  force:
+    description:
+      - Run every step and refresh its cache entry.
+    required: false
+    type: bool
+    default: false
+  cache_dir:
+    description:
+      - Directory of the step cache.
+    required: false
+    type: path
+    default: ~/.cache/catamaran/steps
+  max_size:
+    description:
+      - Size of the stored outputs above which entries are evicted, like C(2G).
+    required: false
+    type: str
+    default: 2G
+author:
+  - Hamed Ghasemzadeh (hg@evgnomon.org)
+"""
+
+EXAMPLES = r"""
+- name: Check and build
+  evgnomon.catamaran.step_cache:
+    chdir: "{{ workspace }}"
+    steps:
+      - name: check
+        command: make check
+        inputs: ["*", "!.git/*", "!dist/*"]
+        tools: ["go version"]
+      - name: build
+        command: make build
+        inputs: ["*", "!.git/*"]
+        outputs: ["dist/*"]
+        env: [GOFLAGS]
+        tools: ["go version"]
+"""
+
+RETURN = r"""
+steps:
+  description: Report of every step.
+  type: list
+  elements: dict
+  returned: always
+  contains:
+    name:
+      description: Name of the step.
+      type: str
+    key:
+      description: Input hash of the step.
+      type: str
+    hit:
+      description: Whether the outputs were restored from the cache.
+      type: bool
+    rc:
+      description: Exit code of the command, 0 on a hit.
+      type: int
+    seconds:
+      description: Time the step took.
+      type: float
+    saved_seconds:
+      description: Run time of the cached step minus the time to restore it.
+      type: float
+    files:
+      description: Output files stored on a miss or rewritten on a hit.
+      type: int
+saved_seconds:
+  description: Time saved by all hits.
+  type: float
+  returned: always
+metrics:
+  description: A C(step <name>) phase per step, C(hits), C(misses) and the peak RSS.
+  type: dict
+  returned: always
+"""
+
+
+def run_module():
+    step_options = dict(
+        name=dict(type="str", required=True),
+        command=dict(type="str", required=True),
+        inputs=dict(type="list", elements="str", default=[]),
+        outputs=dict(type="list", elements="str", default=[]),
+        env=dict(type="list", elements="str", default=[]),
+        tools=dict(type="list", elements="str", default=[]),
+    )
+    module_args = dict(
+        chdir=dict(type="path", required=True),
+        steps=dict(type="list", elements="dict", options=step_options, required=True),
+        parallel=dict(type="bool", default=True),
+        force=dict(type="bool", default=False),
+        cache_dir=dict(type="path", default="~/.cache/catamaran/steps"),
+        max_size=dict(type="str", default="2G"),
+    )
+
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=False)
+    result = AnsibleResult()
+    instrument(module, result.metrics)
+
+    try:
+        max_size = module.human_to_bytes(module.params["max_size"])
+        cache = StepCache(module.params["cache_dir"], max_size)
+        reports = run_steps(
+            [Step(**s) for s in module.params["steps"]],
+            module.params["chdir"],
+            cache,
+            parallel=module.params["parallel"],
+            force=module.params["force"],
+        )
+    except Exception as e:
+        module.fail_json(msg=f"Error: {str(e)}")
+
+    for r in reports:
+        result.metrics.record(f"step {r.name}", r.seconds)
+        result.metrics.count("hits" if r.hit else "misses")
+    failed = [r for r in reports if r.rc != 0]
+    result.changed = any(not r.hit for r in reports)
+    result.failed = bool(failed)
+    result.msg = ", ".join(
+        f"{r.name}: {'hit' if r.hit else 'miss'} {r.seconds}s"
+        + (f" (saved {r.saved_seconds}s)" if r.hit else "")
+        + (f" failed with {r.rc}" if r.rc else "")
+        for r in reports
+    )
+    if failed:
+        result.stdout = failed[0].stdout
+        result.stderr = failed[0].stderr
+    saved = round(sum(r.saved_seconds for r in reports), 3)
+    steps = [r.to_dict() for r in reports]
+    if result.failed:
+        module.fail_json(**result.to_dict(), steps=steps, saved_seconds=saved)
+    module.exit_json(**result.to_dict(), steps=steps, saved_seconds=saved)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Measure the cold start of catamaran entry points.
+
+Every case runs in a fresh interpreter, as Ansible runs every module task in a
+new process on the controller. The best of ``--runs`` is reported next to a bare
+interpreter start, with the third party packages each case loaded.
+
+    python benchmarks/startup.py --runs 20
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+HEAVY = ["typer", "rich", "httpx", "docker", "requests"]
+
+CASES = {
+    "bare interpreter": "pass",
+    "filter plugin (catamaran.topology)": "import catamaran.topology",
+    "module api (catamaran.ghcr)": "from catamaran.ghcr import delete_image",
+    "gh_image absent imports": (
+        "import catamaran.github, catamaran.ansible, catamaran.ghcr, catamaran.textfile"
+    ),
+    "release_binary imports": "import catamaran.releases",
+    "image_prefetch imports": "import catamaran.registry",
+    "cli --help": (
+        "import sys; sys.argv = ['catamaran', '--help']\n"
+        "from catamaran.cli import main\n"
+        "try:\n    main()\nexcept SystemExit:\n    pass"
+    ),
+}
+
+REPORT = (
+    "\nimport json, sys\n"
+    "print(json.dumps(sorted(m for m in {heavy} if m in sys.modules)), file=sys.stderr)"
+)
+
+
+def run(code: str) -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code + REPORT.format(heavy=HEAVY)],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(proc.stderr.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    for name, code in CASES.items():
+        times = []
+        for _ in range(args.runs):
+            elapsed, loaded = run(code)
+            times.append(elapsed)
+        print(f"{name:40} {min(times) * 1000:7.1f} ms  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
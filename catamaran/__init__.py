@@ -1,59 +1,21 @@
-from typing_extensions import Annotated
-import typer
-import httpx
-import asyncio
+"""GitOps scripts for yacht users.
 
-app = typer.Typer()
+Submodules are independent and import their heavy dependencies, typer,
+httpx and docker, only where they are used, so importing a submodule from
+an Ansible module or plugin stays cheap. The names below are kept for
+existing callers and resolved on first access.
+"""
 
+_LAZY = {
+    "app": "catamaran.cli",
+    "main": "catamaran.cli",
+    "delete_image": "catamaran.ghcr",
+}
 
-async def delete_image(tag: str, image_name, username, token):
-    api_url = f"https://api.github.com/users/{username}/packages/container/{image_name}/versions"
-    async with httpx.AsyncClient() as client:
-        headers = {
-            "Authorization": f"token {token}",
-            "Accept": "application/vnd.github.v3+json",
-        }
 
-        # Fetch image versions
-        response = await client.get(api_url, headers=headers)
-        response.raise_for_status()
-        versions = response.json()
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module 'catamaran' has no attribute '{name}'")
+    import importlib
 
-        version_id = None
-        for version in versions:
-            if (
-                tag in version["metadata"]["container"]["tags"]
-                or version["name"] == tag
-            ):
-                version_id = version["id"]
-                break
-
-        if not version_id:
-            print(f"Image version with tag '{tag}' not found.")
-        delete_url = f"{api_url}/{version_id}"
-        delete_response = await client.delete(delete_url, headers=headers)
-        delete_response.raise_for_status()
-
-
-@app.command()
-def delete(
-    tag: Annotated[str, typer.Option()],
-    image_name: Annotated[str, typer.Option()],
-    username: Annotated[str, typer.Option()],
-    token: Annotated[str, typer.Option()],
-):
-    asyncio.run(
-        delete_image(
-            tag,
-            image_name,
-            username,
-            token,
-        )
-    )
-
-def main():
-    app()
-
-
-if __name__ == "__main__":
-    main()
+    return getattr(importlib.import_module(_LAZY[name]), name)
@@ -0,0 +1,305 @@
+"""Long lived controller agent keeping clients warm across module runs.
+
+Modules run in a fresh process per task, so every task pays for new HTTP
+connections, a Docker connection, registry logins and DNS lookups. With
+``CATAMARAN_AGENT`` set, modules hand those operations to an agent listening
+on a Unix socket, starting it on first use. The agent exits after
+``CATAMARAN_AGENT_IDLE`` seconds without requests or on ``shutdown``. When it
+cannot be reached modules run the operation themselves.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from catamaran.metrics import Metrics
+
+AGENT_ENV = "CATAMARAN_AGENT"
+SOCKET_ENV = "CATAMARAN_AGENT_SOCK"
+IDLE_ENV = "CATAMARAN_AGENT_IDLE"
+DEFAULT_SOCKET = "~/.cache/catamaran/agent.sock"
+DEFAULT_IDLE = 300
+DNS_TTL = 60
+LINE_LIMIT = 16 << 20
+
+
+class AgentError(Exception):
+    """An operation failed in the agent, or the agent went away while running it."""
+
+
+def enabled() -> bool:
+    return os.getenv(AGENT_ENV, "").lower() not in ("", "0", "false", "no")
+
+
+def socket_path() -> str:
+    return os.path.expanduser(os.getenv(SOCKET_ENV, DEFAULT_SOCKET))
+
+
+def _connect(path: str, timeout: Optional[float]) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def alive(path: Optional[str] = None) -> bool:
+    try:
+        _connect(path or socket_path(), 1).close()
+    except OSError:
+        return False
+    return True
+
+
+def start(path: Optional[str] = None, timeout: float = 10) -> None:
+    """Start an agent on ``path`` unless one is listening, and wait for it.
+
+    Concurrent modules take a lock so only one of them spawns the agent.
+    """
+    path = path or socket_path()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if alive(path):
+            return
+        subprocess.Popen(
+            [sys.executable, "-m", "catamaran.agent"],
+            env={**os.environ, SOCKET_ENV: path},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + timeout
+        while not alive(path):
+            if time.monotonic() > deadline:
+                raise OSError(f"catamaran agent did not start on {path}")
+            time.sleep(0.02)
+
+
+def call(op: str, path: Optional[str] = None, timeout: Optional[float] = None, **args) -> Dict:
+    """Run ``op`` in the agent and return its result.
+
+    Raises ``OSError`` when no agent accepts the connection, in which case
+    nothing ran, and ``AgentError`` when the operation failed or the agent
+    went away after receiving it.
+    """
+    sock = _connect(path or socket_path(), timeout)
+    try:
+        with sock, sock.makefile("rwb") as stream:
+            stream.write(json.dumps({"op": op, "args": args}).encode() + b"\n")
+            stream.flush()
+            line = stream.readline()
+    except OSError as e:
+        raise AgentError(f"catamaran agent failed during {op}: {e}")
+    if not line:
+        raise AgentError(f"catamaran agent closed the connection during {op}")
+    response = json.loads(line)
+    if "error" in response:
+        raise AgentError(response["error"])
+    return response["result"]
+
+
+def delegate(op: str, **args) -> Optional[Dict]:
+    """Result of ``op`` from the agent, or None to run it in the module.
+
+    None is returned when the agent is disabled or cannot be started, never
+    after the agent received the request, so operations do not run twice.
+    """
+    if not enabled():
+        return None
+    try:
+        try:
+            return call(op, **args)
+        except (FileNotFoundError, ConnectionRefusedError):
+            start()
+            return call(op, **args)
+    except AgentError:
+        raise
+    except OSError:
+        return None
+
+
+def _digest(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+class Agent:
+    """Serves operations over a Unix socket, sharing clients between requests.
+
+    Requests and responses are single JSON lines, one request per connection.
+    """
+
+    def __init__(self, path: str, idle: float = DEFAULT_IDLE):
+        self.path = path
+        self.idle = idle
+        self.started = time.monotonic()
+        self.last = time.monotonic()
+        self.active = 0
+        self.requests = 0
+        self.http: Any = None
+        # APIClient is not thread safe, every concurrent build takes its own.
+        self.docker: List[Any] = []
+        self.logins: Dict[int, Set[Tuple[str, str, str]]] = {}
+        self.dns: Dict[str, Tuple[float, str]] = {}
+        self.stopped = asyncio.Event()
+        self.ops: Dict[str, Callable] = {
+            "ping": self.ping,
+            "shutdown": self.shutdown,
+            "resolve": self.resolve,
+            "delete_image": self.delete_image,
+            "build_image": self.build_image,
+        }
+
+    def _http(self):
+        if self.http is None:
+            import httpx
+
+            self.http = httpx.AsyncClient(
+                http2=importlib.util.find_spec("h2") is not None, timeout=300
+            )
+        return self.http
+
+    async def ping(self) -> Dict:
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.monotonic() - self.started, 3),
+            "requests": self.requests,
+        }
+
+    async def shutdown(self) -> Dict:
+        self.stopped.set()
+        return {"pid": os.getpid()}
+
+    async def resolve(self, host: str) -> Dict:
+        cached = self.dns.get(host)
+        if cached and cached[0] > time.monotonic():
+            return {"address": cached[1], "cached": True}
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, None, family=socket.AF_INET, type=socket.SOCK_STREAM
+        )
+        if not infos:
+            raise ValueError(f"Unable to resolve domain '{host}' to any IP address")
+        address = infos[0][4][0]
+        self.dns[host] = (time.monotonic() + DNS_TTL, address)
+        return {"address": address, "cached": False}
+
+    async def delete_image(self, tag: str, image_name: str, username: str, token: str) -> Dict:
+        from catamaran.ghcr import delete_image
+
+        metrics = Metrics()
+        with metrics.phase("delete"):
+            await delete_image(tag, image_name, username, token, client=self._http())
+        return {"metrics": metrics.to_dict()}
+
+    async def build_image(
+        self,
+        image: str,
+        context: str,
+        dockerfile: str,
+        username: str,
+        token: str,
+        registry: str,
+        repository: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> Dict:
+        from catamaran.registry import build_image, docker_client, push_image
+
+        client = self.docker.pop() if self.docker else docker_client()
+        metrics = Metrics()
+
+        def run():
+            logins = self.logins.setdefault(id(client), set())
+            login = (registry, username, _digest(token))
+            if login not in logins:
+                with metrics.phase("login"):
+                    client.login(username=username, password=token, registry=registry)
+                logins.add(login)
+            build_image(client, image, context, dockerfile, metrics)
+            if repository:
+                push_image(client, repository, tag, metrics)
+
+        try:
+            await asyncio.to_thread(run)
+        except BaseException:
+            self.logins.pop(id(client), None)
+            client.close()
+            raise
+        self.docker.append(client)
+        return {"metrics": metrics.to_dict()}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.active += 1
+        self.requests += 1
+        try:
+            request = json.loads(await reader.readline())
+            try:
+                op = self.ops.get(request["op"])
+                if op is None:
+                    raise ValueError(f"Unknown agent operation {request['op']}")
+                response: Dict = {"result": await op(**request.get("args", {}))}
+            except Exception as e:
+                response = {"error": str(e) or type(e).__name__}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        except (ValueError, KeyError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self.active -= 1
+            self.last = time.monotonic()
+
+    async def _watch_idle(self):
+        while not self.stopped.is_set():
+            await asyncio.sleep(1)
+            if not self.active and time.monotonic() - self.last > self.idle:
+                self.stopped.set()
+
+    async def serve(self):
+        if alive(self.path):
+            return
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle, self.path, limit=LINE_LIMIT)
+        os.chmod(self.path, 0o600)
+        inode = os.stat(self.path).st_ino
+        watcher = asyncio.create_task(self._watch_idle())
+        try:
+            await self.stopped.wait()
+        finally:
+            watcher.cancel()
+            server.close()
+            # A new agent may already listen on the path while requests finish.
+            try:
+                if os.stat(self.path).st_ino == inode:
+                    os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            while self.active:
+                await asyncio.sleep(0.05)
+            if self.http is not None:
+                await self.http.aclose()
+            for client in self.docker:
+                client.close()
+
+
+def serve(path: Optional[str] = None, idle: Optional[float] = None):
+    path = path or socket_path()
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    idle = idle if idle is not None else float(os.getenv(IDLE_ENV, DEFAULT_IDLE))
+    asyncio.run(Agent(path, idle).serve())
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,5 +1,7 @@
-from dataclasses import dataclass, asdict
-from typing import Optional
+from dataclasses import dataclass, field, fields
+from typing import Any, Optional
+
+from catamaran.metrics import Metrics
 
 
 @dataclass
@@ -11,6 +13,32 @@ class AnsibleResult:
     msg: Optional[str] = ""
     stderr: Optional[str] = None
     stdout: Optional[str] = None
+    metrics: Metrics = field(default_factory=Metrics, repr=False, compare=False)
 
     def to_dict(self):
-        return asdict(self)
+        result = {f.name: getattr(self, f.name) for f in fields(self)}
+        result["metrics"] = self.metrics.to_dict()
+        return result
+
+
+def instrument(module: Any, metrics: Optional[Metrics] = None, task: Optional[str] = None) -> Metrics:
+    """Attach ``metrics`` to every result the module exits with.
+
+    Wraps ``exit_json`` and ``fail_json``, so early exits and failures carry
+    the same ``metrics`` key as the final result, and appends the metrics to
+    ``$CATAMARAN_METRICS_FILE`` when it is set.
+    """
+    metrics = metrics or Metrics()
+    task = task or module._name.rsplit(".", 1)[-1]
+
+    def wrap(exit, failed):
+        def wrapped(**kwargs):
+            kwargs["metrics"] = metrics.to_dict()
+            metrics.write(task, failed=failed or bool(kwargs.get("failed")))
+            exit(**kwargs)
+
+        return wrapped
+
+    module.exit_json = wrap(module.exit_json, False)
+    module.fail_json = wrap(module.fail_json, True)
+    return metrics
@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+from catamaran.releases import file_digest, write_atomic
+
+DEFAULT_CACHE_DIR = "~/.cache/catamaran/artifacts"
+
+
+def _cache_dir(*parts: str) -> str:
+    path = os.path.join(os.path.expanduser(DEFAULT_CACHE_DIR), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cached_digest(path: str) -> str:
+    """Return the sha256 hex digest of a file, hashing it only once per version.
+
+    Digests are remembered on disk keyed by path, size and mtime, so the many
+    worker processes of a play share the same result.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = f"{st.st_size} {st.st_mtime_ns}"
+    entry = os.path.join(
+        _cache_dir("digests"), hashlib.sha1(path.encode()).hexdigest()
+    )
+    try:
+        with open(entry) as f:
+            cached_stamp, digest = f.read().rsplit(" ", 1)
+        if cached_stamp == stamp:
+            return digest
+    except (FileNotFoundError, ValueError):
+        pass
+    digest = file_digest(path).split(":", 1)[1]
+    write_atomic(entry, f"{stamp} {digest}".encode())
+    return digest
+
+
+def compressed(path: str, digest: str) -> str:
+    """Return a gzip copy of ``path`` stored under its digest, creating it once."""
+    blob = os.path.join(_cache_dir("blobs"), f"{digest}.gz")
+    if not os.path.exists(blob):
+        tmp = f"{blob}.{os.getpid()}"
+        with open(path, "rb") as f, gzip.open(tmp, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(f, out, 1 << 20)
+        os.replace(tmp, blob)
+    return blob
+
+
+def _relay_marker(digest: str, location: str) -> str:
+    return os.path.join(_cache_dir("relay", digest), location)
+
+
+def publish_relay(digest: str, location: str, address: str, token: str):
+    """Record that ``address`` serves the artifact to its peers in ``location``.
+
+    ``token`` is the random path prefix the relay serves the artifact under.
+    """
+    payload = json.dumps({"address": address, "token": token, "at": time.time()})
+    write_atomic(_relay_marker(digest, location), payload.encode(), mode=0o600)
+
+
+def wait_relay(
+    digest: str, location: str, timeout: float, ttl: float, interval: float = 1
+) -> Optional[Dict[str, str]]:
+    """Wait for a relay of ``location`` younger than ``ttl``.
+
+    Returns its ``address`` and ``token``, or None when none showed up in time.
+    """
+    deadline = time.monotonic() + timeout
+    marker = _relay_marker(digest, location)
+    while True:
+        try:
+            with open(marker) as f:
+                relay = json.load(f)
+            if time.time() - relay["at"] < ttl:
+                return {"address": relay["address"], "token": relay["token"]}
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(interval)
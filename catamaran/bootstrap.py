@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+import socket
+import time
+from typing import Dict, List, Optional
+
+
+@dataclass
+class BarrierResult:
+    ready: Dict[str, float] = field(default_factory=dict)
+    pending: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def split_endpoint(endpoint: str, default_port: Optional[int] = None):
+    host, sep, port = endpoint.rpartition(":")
+    if not sep:
+        if default_port is None:
+            raise ValueError(f"Endpoint {endpoint} has no port")
+        return endpoint, default_port
+    return host, int(port)
+
+
+def is_open(host: str, port: int, timeout: float = 2) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_endpoints(
+    endpoints: List[str], timeout: float = 300, interval: float = 2
+) -> BarrierResult:
+    """Poll all endpoints together until every one accepts TCP connections.
+
+    One loop checks every pending endpoint concurrently per round, so the
+    barrier opens as soon as the slowest endpoint is up.
+    """
+    result = BarrierResult()
+    start = time.monotonic()
+    pending = list(dict.fromkeys(endpoints))
+    with ThreadPoolExecutor(max_workers=max(1, min(32, len(pending)))) as pool:
+        while pending:
+            checks = pool.map(lambda e: is_open(*split_endpoint(e)), pending)
+            now = time.monotonic()
+            for endpoint, up in list(zip(pending, checks)):
+                if up:
+                    result.ready[endpoint] = round(now - start, 3)
+                    pending.remove(endpoint)
+            if not pending or now - start >= timeout:
+                break
+            time.sleep(interval)
+    result.pending = pending
+    result.seconds = round(time.monotonic() - start, 3)
+    return result
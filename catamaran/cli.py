@@ -0,0 +1,167 @@
+from typing import List, Optional
+from typing_extensions import Annotated
+import asyncio
+
+import typer
+
+app = typer.Typer()
+images = typer.Typer(help="Local index of GitHub Container Registry packages")
+app.add_typer(images, name="images")
+
+
+@app.command()
+def delete(
+    tag: Annotated[str, typer.Option()],
+    image_name: Annotated[str, typer.Option()],
+    username: Annotated[str, typer.Option()],
+    token: Annotated[str, typer.Option()],
+    index: Annotated[
+        Optional[str], typer.Option(help="Find the version in this images index")
+    ] = None,
+):
+    from catamaran.ghcr import ImageIndex, delete_image
+
+    asyncio.run(
+        delete_image(
+            tag,
+            image_name,
+            username,
+            token,
+            index=ImageIndex(index) if index else None,
+        )
+    )
+
+@app.command()
+def agent(
+    stop: Annotated[bool, typer.Option("--stop", help="Ask the running agent to exit")] = False,
+    idle: Annotated[Optional[float], typer.Option(help="Exit after this many idle seconds")] = None,
+):
+    """Serve the controller agent modules delegate to with CATAMARAN_AGENT=1."""
+    from catamaran.agent import AgentError, call, serve
+
+    if not stop:
+        serve(idle=idle)
+        return
+    try:
+        print(f"Stopped agent {call('shutdown', timeout=5)['pid']}")
+    except (OSError, AgentError) as e:
+        print(f"No agent running: {e}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def logs(
+    root: Annotated[str, typer.Argument(help="Receiver working directory")],
+    since: Annotated[Optional[str], typer.Option(help="ISO time or offset like 2h")] = None,
+    until: Annotated[Optional[str], typer.Option(help="ISO time or offset like 30m")] = None,
+    host: Annotated[Optional[List[str]], typer.Option()] = None,
+    grep: Annotated[Optional[str], typer.Option()] = None,
+    limit: Annotated[int, typer.Option(help="Print only the last N records")] = 0,
+    workers: Annotated[Optional[int], typer.Option()] = None,
+    raw: Annotated[bool, typer.Option("--raw", help="Print records as stored")] = False,
+):
+    from catamaran.logs import Query, format_record, parse_time, query_logs
+
+    query = Query(
+        since=parse_time(since) if since else None,
+        until=parse_time(until) if until else None,
+        hosts=set(host or []),
+        grep=grep.encode() if grep else None,
+    )
+    matches = query_logs(root, query, workers)
+    for _, line in matches[-limit:] if limit else matches:
+        print(line.decode(errors="replace") if raw else format_record(line))
+
+
+def _age(seconds: float) -> str:
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit}"
+    return f"{int(seconds)}s"
+
+
+def _size(size: Optional[int]) -> str:
+    if size is None:
+        return "-"
+    value = float(size)
+    for unit in ("B", "K", "M"):
+        if value < 1024:
+            return f"{value:.0f}B" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}G"
+
+
+@images.command("sync")
+def images_sync(
+    targets: Annotated[List[str], typer.Argument(help="owner or owner/package")],
+    token: Annotated[Optional[str], typer.Option(envvar="GITHUB_TOKEN")] = None,
+    username: Annotated[Optional[str], typer.Option()] = None,
+    index: Annotated[Optional[str], typer.Option(help="Index file")] = None,
+    full: Annotated[bool, typer.Option("--full", help="Read every page and drop deleted versions")] = False,
+    sizes: Annotated[bool, typer.Option(help="Read image sizes from the registry")] = True,
+    concurrency: Annotated[int, typer.Option()] = 4,
+):
+    from catamaran.ghcr import ImageIndex, sync
+
+    db = ImageIndex(index)
+    try:
+        reports = asyncio.run(
+            sync(db, targets, token, username, full, sizes, concurrency)
+        )
+    finally:
+        db.close()
+    for r in reports:
+        state = "unchanged" if r.not_modified else f"{r.versions} new"
+        print(
+            f"{r.owner}/{r.package}: {state}, {r.pages} pages"
+            + (f", {r.pruned} pruned" if r.pruned else "")
+            + (f", {r.sized} sized" if r.sized else "")
+            + f" in {r.seconds}s"
+        )
+
+
+@images.command("query")
+def images_query(
+    owner: Annotated[Optional[str], typer.Option()] = None,
+    package: Annotated[Optional[str], typer.Option()] = None,
+    tag: Annotated[Optional[str], typer.Option(help="Glob like v1.*")] = None,
+    untagged: Annotated[bool, typer.Option("--untagged")] = False,
+    older_than: Annotated[Optional[str], typer.Option(help="ISO time or offset like 30d")] = None,
+    newer_than: Annotated[Optional[str], typer.Option(help="ISO time or offset like 2h")] = None,
+    index: Annotated[Optional[str], typer.Option(help="Index file")] = None,
+    ids: Annotated[bool, typer.Option("--ids", help="Print only version ids")] = False,
+):
+    import time
+
+    from catamaran.ghcr import ImageIndex
+    from catamaran.logs import parse_time
+
+    db = ImageIndex(index)
+    try:
+        rows = db.query(
+            owner=owner,
+            package=package,
+            tag=tag,
+            untagged=untagged,
+            before=parse_time(older_than) if older_than else None,
+            after=parse_time(newer_than) if newer_than else None,
+        )
+    finally:
+        db.close()
+    now = time.time()
+    for row in rows:
+        if ids:
+            print(row["id"])
+            continue
+        print(
+            f"{row['owner']}/{row['package']}\t{row['id']}\t{_age(now - row['created_at'])}"
+            f"\t{_size(row['size'])}\t{','.join(row['tags']) or '-'}\t{row['digest']}"
+        )
+
+
+def main():
+    app()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+DEFAULT_PATH = "~/.cache/catamaran/facts.db"
+DEFAULT_TTL = 86400
+
+# Newer ansible-core releases prefix cache keys with a schema id, e.g. "s1_".
+_SCHEMA_PREFIX = re.compile(r"^s\d+_")
+
+
+def host_of(key: str) -> str:
+    return _SCHEMA_PREFIX.sub("", key, count=1)
+
+
+def default_path() -> str:
+    return os.getenv("ANSIBLE_CACHE_PLUGIN_CONNECTION") or DEFAULT_PATH
+
+
+class FactCache:
+    """Host facts stored in a single SQLite file, each entry with its own TTL.
+
+    A TTL of 0 means the entry never expires, matching ``fact_caching_timeout``.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_TTL):
+        self.path = os.path.expanduser(os.path.expandvars(path or default_path()))
+        if os.path.isdir(self.path):
+            self.path = os.path.join(self.path, "facts.db")
+        self.ttl = float(ttl)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            " key TEXT PRIMARY KEY,"
+            " host TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " ttl REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS facts_host ON facts (host)")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _fresh_clause(self):
+        return "(ttl = 0 OR updated_at + ttl >= ?)", (time.time(),)
+
+    def get(self, key: str) -> Optional[dict]:
+        clause, args = self._fresh_clause()
+        row = self._conn.execute(
+            f"SELECT value FROM facts WHERE key = ? AND {clause}", (key, *args)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        # An explicit per-host TTL survives later writes that don't carry one.
+        self._conn.execute(
+            "INSERT INTO facts (key, host, value, updated_at, ttl)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET"
+            " value = excluded.value, updated_at = excluded.updated_at",
+            (
+                key,
+                host_of(key),
+                json.dumps(value),
+                time.time(),
+                self.ttl if ttl is None else float(ttl),
+            ),
+        )
+        self._conn.commit()
+
+    def set_ttl(self, hosts: Iterable[str], ttl: float) -> List[str]:
+        hosts = list(hosts)
+        updated = self.keys_of(hosts)
+        self._conn.executemany(
+            "UPDATE facts SET ttl = ? WHERE host = ?",
+            [(float(ttl), host) for host in hosts],
+        )
+        self._conn.commit()
+        return updated
+
+    def keys(self) -> List[str]:
+        clause, args = self._fresh_clause()
+        rows = self._conn.execute(f"SELECT key FROM facts WHERE {clause}", args)
+        return [row[0] for row in rows]
+
+    def contains(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def delete(self, key: str):
+        self._conn.execute("DELETE FROM facts WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def keys_of(self, hosts: List[str]) -> List[str]:
+        if not hosts:
+            return []
+        marks = ",".join("?" * len(hosts))
+        rows = self._conn.execute(
+            f"SELECT key FROM facts WHERE host IN ({marks})", hosts
+        )
+        return [row[0] for row in rows]
+
+    def invalidate(self, hosts: Iterable[str]) -> List[str]:
+        """Drop every entry of the given hosts, returning the removed keys."""
+        hosts = list(hosts)
+        removed = self.keys_of(hosts)
+        self._conn.executemany(
+            "DELETE FROM facts WHERE host = ?", [(host,) for host in hosts]
+        )
+        self._conn.commit()
+        return removed
+
+    def stale(self, hosts: Iterable[str]) -> List[str]:
+        """Return the hosts that have no fresh entry."""
+        fresh = {host_of(key) for key in self.keys()}
+        return [host for host in hosts if host not in fresh]
+
+    def purge_expired(self) -> int:
+        cursor = self._conn.execute(
+            "DELETE FROM facts WHERE ttl > 0 AND updated_at + ttl < ?", (time.time(),)
+        )
+        self._conn.commit()
+        return cursor.rowcount
+
+    def flush(self):
+        self._conn.execute("DELETE FROM facts")
+        self._conn.commit()
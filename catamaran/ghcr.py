@@ -0,0 +1,522 @@
+import asyncio
+from dataclasses import dataclass, asdict
+from datetime import datetime
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+API_URL = "https://api.github.com"
+REGISTRY_URL = "https://ghcr.io"
+DEFAULT_INDEX = "~/.cache/catamaran/ghcr.db"
+PAGE_SIZE = 100
+MANIFEST_TYPES = ", ".join(
+    [
+        "application/vnd.oci.image.index.v1+json",
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+        "application/vnd.docker.distribution.manifest.v2+json",
+    ]
+)
+
+LAST_PAGE_RE = re.compile(r'[?&]page=(\d+)[^>]*>;\s*rel="last"')
+
+
+def versions_url(username: str, image_name: str, scope: str = "users") -> str:
+    return f"{API_URL}/{scope}/{username}/packages/container/{image_name}/versions"
+
+
+def find_version(versions, tag: str) -> Optional[int]:
+    """Id of the package version carrying ``tag`` or named after it."""
+    for version in versions:
+        if tag in version["metadata"]["container"]["tags"] or version["name"] == tag:
+            return version["id"]
+    return None
+
+
+def api_headers(token: Optional[str]) -> Dict[str, str]:
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if token:
+        headers["Authorization"] = f"token {token}"
+    return headers
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class ImageIndex:
+    """Container package versions of GHCR owners in a single SQLite file.
+
+    ``packages`` keeps the ETag of the first versions page of every package,
+    ``versions`` one row per version and ``tags`` the version each tag points
+    at, a tag moving to a new version moves its row.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.expanduser(path or DEFAULT_INDEX)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS packages ("
+            " owner TEXT NOT NULL,"
+            " package TEXT NOT NULL,"
+            " scope TEXT NOT NULL,"
+            " etag TEXT,"
+            " synced_at REAL,"
+            " PRIMARY KEY (owner, package));"
+            "CREATE TABLE IF NOT EXISTS versions ("
+            " id INTEGER PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " package TEXT NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " size INTEGER);"
+            "CREATE INDEX IF NOT EXISTS versions_package ON versions (owner, package);"
+            "CREATE INDEX IF NOT EXISTS versions_created ON versions (created_at);"
+            "CREATE TABLE IF NOT EXISTS tags ("
+            " owner TEXT NOT NULL,"
+            " package TEXT NOT NULL,"
+            " tag TEXT NOT NULL,"
+            " version_id INTEGER NOT NULL,"
+            " PRIMARY KEY (owner, package, tag));"
+            "CREATE INDEX IF NOT EXISTS tags_version ON tags (version_id);"
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def package(self, owner: str, package: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Scope, ``users`` or ``orgs``, and ETag of an indexed package."""
+        row = self._conn.execute(
+            "SELECT scope, etag FROM packages WHERE owner = ? AND package = ?",
+            (owner, package),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def scope(self, owner: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT scope FROM packages WHERE owner = ? LIMIT 1", (owner,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_package(self, owner: str, package: str, scope: str, etag: Optional[str]):
+        self._conn.execute(
+            "INSERT INTO packages (owner, package, scope, etag, synced_at)"
+            " VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(owner, package) DO UPDATE SET"
+            " scope = excluded.scope, etag = excluded.etag, synced_at = excluded.synced_at",
+            (owner, package, scope, etag, time.time()),
+        )
+        self._conn.commit()
+
+    def seen(self, versions: Iterable[Dict]) -> Set[int]:
+        """Ids of the given API versions already indexed without changes."""
+        seen = set()
+        for v in versions:
+            row = self._conn.execute(
+                "SELECT updated_at FROM versions WHERE id = ?", (v["id"],)
+            ).fetchone()
+            if row and row[0] == _timestamp(v["updated_at"]):
+                seen.add(v["id"])
+        return seen
+
+    def upsert(self, owner: str, package: str, versions: Iterable[Dict]) -> int:
+        count = 0
+        for v in versions:
+            self._conn.execute(
+                "INSERT INTO versions (id, owner, package, digest, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                (
+                    v["id"],
+                    owner,
+                    package,
+                    v["name"],
+                    _timestamp(v["created_at"]),
+                    _timestamp(v["updated_at"]),
+                ),
+            )
+            self._conn.execute("DELETE FROM tags WHERE version_id = ?", (v["id"],))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tags (owner, package, tag, version_id)"
+                " VALUES (?, ?, ?, ?)",
+                [(owner, package, t, v["id"]) for t in v["metadata"]["container"]["tags"]],
+            )
+            count += 1
+        self._conn.commit()
+        return count
+
+    def prune(self, owner: str, package: str, keep: Set[int]) -> int:
+        """Drop the versions of a package that are not in ``keep``."""
+        ids = [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT id FROM versions WHERE owner = ? AND package = ?", (owner, package)
+            )
+            if row[0] not in keep
+        ]
+        for version_id in ids:
+            self.remove(version_id, commit=False)
+        self._conn.commit()
+        return len(ids)
+
+    def remove(self, version_id: int, commit: bool = True):
+        self._conn.execute("DELETE FROM tags WHERE version_id = ?", (version_id,))
+        self._conn.execute("DELETE FROM versions WHERE id = ?", (version_id,))
+        if commit:
+            self._conn.commit()
+
+    def missing_sizes(self, owner: str, package: str) -> List[Tuple[int, str]]:
+        return list(
+            self._conn.execute(
+                "SELECT id, digest FROM versions"
+                " WHERE owner = ? AND package = ? AND size IS NULL",
+                (owner, package),
+            )
+        )
+
+    def set_sizes(self, sizes: Dict[int, int]):
+        self._conn.executemany(
+            "UPDATE versions SET size = ? WHERE id = ?",
+            [(size, version_id) for version_id, size in sizes.items()],
+        )
+        self._conn.commit()
+
+    def find(self, owner: str, package: str, tag: str) -> Optional[int]:
+        """Version id of a tag or digest, without asking the API."""
+        row = self._conn.execute(
+            "SELECT version_id FROM tags WHERE owner = ? AND package = ? AND tag = ?"
+            " UNION ALL SELECT id FROM versions"
+            " WHERE owner = ? AND package = ? AND digest = ?",
+            (owner, package, tag, owner, package, tag),
+        ).fetchone()
+        return row[0] if row else None
+
+    def query(
+        self,
+        owner: Optional[str] = None,
+        package: Optional[str] = None,
+        tag: Optional[str] = None,
+        untagged: bool = False,
+        before: Optional[float] = None,
+        after: Optional[float] = None,
+    ) -> List[Dict]:
+        """Versions matching the filters, newest first.
+
+        ``tag`` is a glob matched against every tag of a version, ``before``
+        and ``after`` bound the creation time.
+        """
+        where: List[str] = ["1 = 1"]
+        args: List[object] = []
+        for column, value in (("v.owner", owner), ("v.package", package)):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(value)
+        if before is not None:
+            where.append("v.created_at < ?")
+            args.append(before)
+        if after is not None:
+            where.append("v.created_at >= ?")
+            args.append(after)
+        if tag:
+            where.append("v.id IN (SELECT version_id FROM tags WHERE tag GLOB ?)")
+            args.append(tag)
+        rows = self._conn.execute(
+            "SELECT v.id, v.owner, v.package, v.digest, v.created_at, v.size,"
+            " group_concat(t.tag, ' ')"
+            " FROM versions v LEFT JOIN tags t ON t.version_id = v.id"
+            f" WHERE {' AND '.join(where)}"
+            " GROUP BY v.id ORDER BY v.created_at DESC",
+            args,
+        )
+        result = []
+        for id_, owner_, package_, digest, created, size, tags in rows:
+            if untagged and tags:
+                continue
+            result.append(
+                {
+                    "id": id_,
+                    "owner": owner_,
+                    "package": package_,
+                    "digest": digest,
+                    "created_at": created,
+                    "size": size,
+                    "tags": sorted((tags or "").split()),
+                }
+            )
+        return result
+
+
+@dataclass
+class SyncReport:
+    owner: str
+    package: str
+    not_modified: bool = False
+    pages: int = 0
+    versions: int = 0
+    pruned: int = 0
+    sized: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def last_page(link: Optional[str]) -> int:
+    m = LAST_PAGE_RE.search(link or "")
+    return int(m.group(1)) if m else 1
+
+
+async def _owner_scope(client, owner: str) -> str:
+    response = await client.get(f"/users/{owner}")
+    response.raise_for_status()
+    return "orgs" if response.json().get("type") == "Organization" else "users"
+
+
+async def list_packages(client, owner: str, scope: str) -> List[str]:
+    names: List[str] = []
+    page = 1
+    while True:
+        response = await client.get(
+            f"/{scope}/{owner}/packages",
+            params={"package_type": "container", "per_page": PAGE_SIZE, "page": page},
+        )
+        response.raise_for_status()
+        batch = response.json()
+        names.extend(p["name"] for p in batch)
+        if len(batch) < PAGE_SIZE:
+            return names
+        page += 1
+
+
+async def _manifest_size(client, repo: str, digest: str, headers: Dict) -> int:
+    response = await client.get(
+        f"{REGISTRY_URL}/v2/{repo}/manifests/{digest}", headers=headers
+    )
+    response.raise_for_status()
+    manifest = response.json()
+    if "manifests" in manifest:
+        # Attestations are listed as platform unknown/unknown.
+        children = [
+            m["digest"]
+            for m in manifest["manifests"]
+            if m.get("platform", {}).get("architecture") != "unknown"
+        ]
+        sizes = await asyncio.gather(
+            *(_manifest_size(client, repo, d, headers) for d in children)
+        )
+        return sum(sizes)
+    return manifest.get("config", {}).get("size", 0) + sum(
+        layer.get("size", 0) for layer in manifest.get("layers", [])
+    )
+
+
+async def fetch_sizes(
+    client, owner: str, package: str, versions: List[Tuple[int, str]],
+    username: Optional[str], token: Optional[str], concurrency: int = 8,
+) -> Dict[int, int]:
+    """Compressed size of every version, summed over its platforms."""
+    repo = f"{owner}/{package}".lower()
+    response = await client.get(
+        f"{REGISTRY_URL}/token",
+        params={"service": "ghcr.io", "scope": f"repository:{repo}:pull"},
+        auth=(username or owner, token) if token else None,
+    )
+    response.raise_for_status()
+    headers = {
+        "Authorization": f"Bearer {response.json()['token']}",
+        "Accept": MANIFEST_TYPES,
+    }
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def size(version_id: int, digest: str):
+        async with semaphore:
+            try:
+                return version_id, await _manifest_size(client, repo, digest, headers)
+            except Exception:
+                # Left unknown and retried on the next sync.
+                return version_id, None
+
+    results = await asyncio.gather(*(size(i, d) for i, d in versions))
+    return {i: s for i, s in results if s is not None}
+
+
+async def sync_package(
+    client,
+    index: ImageIndex,
+    owner: str,
+    package: str,
+    scope: str,
+    full: bool = False,
+    concurrency: int = 4,
+) -> SyncReport:
+    """Bring the versions of a package up to date in the index.
+
+    The first page is requested with the ETag of the last sync, an unchanged
+    package costs a ``304``. Otherwise pages, newest first, are fetched
+    ``concurrency`` at a time until one holds a version already indexed. A
+    ``full`` sync reads every page concurrently and drops deleted versions.
+    """
+    report = SyncReport(owner=owner, package=package)
+    start = time.monotonic()
+    known = index.package(owner, package)
+    url = f"/{scope}/{owner}/packages/container/{package}/versions"
+    headers: Dict[str, str] = {}
+    if known and known[1] and not full:
+        headers["If-None-Match"] = known[1]
+
+    async def page(n: int) -> List[Dict]:
+        response = await client.get(url, params={"per_page": PAGE_SIZE, "page": n})
+        response.raise_for_status()
+        return response.json()
+
+    first = await client.get(url, params={"per_page": PAGE_SIZE, "page": 1}, headers=headers)
+    report.pages = 1
+    if first.status_code == 304:
+        report.not_modified = True
+        report.seconds = round(time.monotonic() - start, 3)
+        return report
+    first.raise_for_status()
+    last = last_page(first.headers.get("link"))
+    versions: List[Dict] = first.json()
+    if full:
+        pages = await asyncio.gather(*(page(n) for n in range(2, last + 1)))
+        report.pages += len(pages)
+        for batch in pages:
+            versions.extend(batch)
+    else:
+        n = 2
+        done = bool(index.seen(versions))
+        while not done and n <= last:
+            batch_pages = await asyncio.gather(
+                *(page(i) for i in range(n, min(n + concurrency, last + 1)))
+            )
+            for batch in batch_pages:
+                report.pages += 1
+                versions.extend(batch)
+                if index.seen(batch):
+                    done = True
+                    break
+            n += concurrency
+    seen = index.seen(versions)
+    fresh = [v for v in versions if v["id"] not in seen]
+    # Oldest first, so a tag on several fetched versions ends on the newest.
+    fresh.sort(key=lambda v: v["created_at"])
+    report.versions = index.upsert(owner, package, fresh)
+    if full:
+        report.pruned = index.prune(owner, package, {v["id"] for v in versions})
+    index.set_package(owner, package, scope, first.headers.get("etag"))
+    report.seconds = round(time.monotonic() - start, 3)
+    return report
+
+
+async def sync(
+    index: ImageIndex,
+    targets: List[str],
+    token: Optional[str] = None,
+    username: Optional[str] = None,
+    full: bool = False,
+    sizes: bool = True,
+    concurrency: int = 4,
+    transport=None,
+) -> List[SyncReport]:
+    """Sync ``owner`` (every container package) or ``owner/package`` targets."""
+    import httpx
+
+    async with httpx.AsyncClient(
+        base_url=API_URL,
+        headers=api_headers(token),
+        follow_redirects=True,
+        timeout=60,
+        transport=transport,
+        limits=httpx.Limits(max_connections=concurrency * 4),
+    ) as client:
+        scopes: Dict[str, str] = {}
+        packages: List[Tuple[str, str]] = []
+        for target in targets:
+            owner, _, package = target.partition("/")
+            if owner not in scopes:
+                scopes[owner] = index.scope(owner) or await _owner_scope(client, owner)
+            if package:
+                packages.append((owner, package))
+            else:
+                names = await list_packages(client, owner, scopes[owner])
+                packages.extend((owner, name) for name in names)
+        reports = await asyncio.gather(
+            *(
+                sync_package(client, index, o, p, scopes[o], full, concurrency)
+                for o, p in packages
+            )
+        )
+        if sizes:
+            for report in reports:
+                missing = index.missing_sizes(report.owner, report.package)
+                if missing:
+                    found = await fetch_sizes(
+                        client, report.owner, report.package, missing,
+                        username, token, concurrency * 2,
+                    )
+                    index.set_sizes(found)
+                    report.sized = len(found)
+        return list(reports)
+
+
+async def delete_image(
+    tag: str,
+    image_name,
+    username,
+    token,
+    index: Optional[ImageIndex] = None,
+    client=None,
+):
+    """Delete the package version of ``tag``.
+
+    With an ``index`` holding the tag the version id is taken from it and
+    checked to still carry the tag, instead of listing the versions. A shared ``httpx.AsyncClient`` is used as is and left
+    open.
+    """
+    if client is None:
+        import httpx
+
+        async with httpx.AsyncClient() as client:
+            return await delete_image(tag, image_name, username, token, index, client)
+
+    version_id = index.find(username, image_name, tag) if index else None
+    known = index.package(username, image_name) if index else None
+    api_url = versions_url(username, image_name, known[0] if known else "users")
+    headers = {
+        "Authorization": f"token {token}",
+        "Accept": "application/vnd.github.v3+json",
+    }
+
+    if index and version_id:
+        # The tag may have moved, or the version been deleted, since the last sync.
+        response = await client.get(f"{api_url}/{version_id}", headers=headers)
+        if response.status_code == 404:
+            index.remove(version_id)
+            version_id = None
+        else:
+            response.raise_for_status()
+            if find_version([response.json()], tag) != version_id:
+                version_id = None
+
+    if not version_id:
+        # Fetch image versions
+        response = await client.get(api_url, headers=headers)
+        response.raise_for_status()
+        version_id = find_version(response.json(), tag)
+
+    if not version_id:
+        print(f"Image version with tag '{tag}' not found.")
+    delete_url = f"{api_url}/{version_id}"
+    delete_response = await client.delete(delete_url, headers=headers)
+    delete_response.raise_for_status()
+    if index and version_id:
+        index.remove(version_id)
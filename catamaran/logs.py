@@ -0,0 +1,339 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import zlib
+
+from catamaran.releases import write_atomic
+
+BLOCK_SIZE = 4 << 20
+CHUNK_SIZE = 1 << 20
+INFLATE_SIZE = 1 << 17
+INDEX_VERSION = 3
+INDEX_SUFFIX = ".idx"
+
+TIME_RE = re.compile(rb'(?<!\\)"time":\s*(\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+HOST_RE = re.compile(rb'"_HOSTNAME":\s*"([^"]*)"')
+DURATION_RE = re.compile(r"^(\d+)([smhd])$")
+UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def line_time(line: bytes) -> Optional[float]:
+    """Return the timestamp of a record in seconds.
+
+    The receiver adds the fluent-bit record time as a ``time`` key, the plain
+    file output writes no other time.
+    """
+    m = TIME_RE.search(line)
+    return float(m.group(1)) if m else None
+
+
+def line_host(line: bytes) -> Optional[str]:
+    m = HOST_RE.search(line)
+    return m.group(1).decode() if m else None
+
+
+def parse_time(value: str, now: Optional[datetime] = None) -> float:
+    """Parse ``2h``/``7d`` style offsets from now or an ISO 8601 timestamp."""
+    m = DURATION_RE.match(value)
+    if m:
+        now = now or datetime.now(timezone.utc)
+        return (now - timedelta(**{UNITS[m.group(2)]: int(m.group(1))})).timestamp()
+    t = datetime.fromisoformat(value)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return t.timestamp()
+
+
+@dataclass
+class Block:
+    """A byte range of a segment, a gzip member for compressed segments."""
+
+    offset: int
+    length: int = 0
+    start: Optional[float] = None
+    end: Optional[float] = None
+    hosts: List[str] = field(default_factory=list)
+
+    def add(self, line: bytes, track_hosts: bool = False):
+        ts = line_time(line)
+        if ts is not None:
+            self.start = ts if self.start is None else min(self.start, ts)
+            self.end = ts if self.end is None else max(self.end, ts)
+        if track_hosts:
+            host = line_host(line)
+            if host and host not in self.hosts:
+                self.hosts.append(host)
+
+    def overlaps(self, since: Optional[float], until: Optional[float]) -> bool:
+        if self.start is None or self.end is None:
+            return since is None and until is None
+        return (since is None or self.end >= since) and (
+            until is None or self.start < until
+        )
+
+
+@dataclass
+class Segment:
+    path: str
+    host: Optional[str]
+    compressed: bool
+    blocks: List[Block] = field(default_factory=list)
+
+
+def segment_host(root: str, path: str) -> Optional[str]:
+    """Host of a receiver segment, None for files mixing several hosts.
+
+    The receiver writes ``hosts/node.<host>`` and rotation moves them to
+    ``hosts/<host>/<YYYYmmddHH>.log.gz``.
+    """
+    name = os.path.basename(path)
+    if name.startswith("node."):
+        return name[len("node."):]
+    parent = os.path.dirname(os.path.relpath(path, root))
+    if name.endswith(".log.gz") and parent and os.path.basename(parent) != "hosts":
+        return os.path.basename(parent)
+    return None
+
+
+def find_segments(root: str) -> List[Tuple[str, Optional[str]]]:
+    segments = []
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            if not (
+                name.startswith("node.")
+                or name.endswith(".log")
+                or name.endswith(".log.gz")
+            ) or name.endswith(INDEX_SUFFIX):
+                continue
+            path = os.path.join(directory, name)
+            segments.append((path, segment_host(root, path)))
+    return segments
+
+
+def read_range(f, offset: int, length: Optional[int] = None) -> Iterator[bytes]:
+    f.seek(offset)
+    remaining = length
+    while remaining is None or remaining > 0:
+        chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            return
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+def inflate(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Stream the content of concatenated gzip members in bounded pieces."""
+    d = zlib.decompressobj(31)
+    for chunk in chunks:
+        while chunk:
+            yield d.decompress(chunk, INFLATE_SIZE)
+            if d.eof:
+                chunk = d.unused_data
+                d = zlib.decompressobj(31)
+            else:
+                chunk = d.unconsumed_tail
+
+
+def split_lines(chunks: Iterable[bytes], needle: Optional[bytes] = None) -> Iterator[bytes]:
+    """Split a byte stream into lines, skipping whole chunks without ``needle``."""
+    tail = b""
+    for chunk in chunks:
+        data = tail + chunk
+        end = data.rfind(b"\n")
+        if end < 0:
+            tail = data
+            continue
+        tail = data[end + 1:]
+        if needle and needle not in data[:end]:
+            continue
+        yield from data[:end].split(b"\n")
+    if tail:
+        yield tail
+
+
+def _index_plain(f, start: int, track_hosts: bool):
+    blocks = []
+    block = Block(start)
+    pos = start
+    f.seek(start)
+    for line in f:
+        if not line.endswith(b"\n"):
+            break
+        block.add(line, track_hosts)
+        pos += len(line)
+        if pos - block.offset >= BLOCK_SIZE:
+            block.length = pos - block.offset
+            blocks.append(block)
+            block = Block(pos)
+    if pos > block.offset:
+        block.length = pos - block.offset
+        blocks.append(block)
+    return blocks, pos
+
+
+def _index_gzip(f, start: int, track_hosts: bool):
+    """Index every complete gzip member from ``start``, a member per block."""
+    blocks = []
+    block = Block(start)
+    pos = start
+    tail = b""
+    d = zlib.decompressobj(31)
+    for chunk in read_range(f, start):
+        while chunk:
+            lines = (tail + d.decompress(chunk)).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                block.add(line, track_hosts)
+            if d.eof:
+                if tail:
+                    block.add(tail, track_hosts)
+                tail = b""
+                pos += len(chunk) - len(d.unused_data)
+                block.length = pos - block.offset
+                blocks.append(block)
+                block = Block(pos)
+                chunk = d.unused_data
+                d = zlib.decompressobj(31)
+            else:
+                # Members larger than a read span several chunks.
+                pos += len(chunk)
+                chunk = b""
+    # A member still being written is picked up by the next update.
+    return blocks, block.offset
+
+
+def _load_index(path: str, st: os.stat_result) -> Optional[Dict]:
+    try:
+        with open(path + INDEX_SUFFIX) as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if (
+        index.get("version") != INDEX_VERSION
+        or index.get("inode") != st.st_ino
+        or index.get("indexed", 0) > st.st_size
+    ):
+        return None
+    return index
+
+
+def index_segment(path: str, host: Optional[str]) -> Segment:
+    """Load the sparse index of a segment, extending it with appended data.
+
+    Indexes are stored next to the segment as ``<segment>.idx`` and record
+    the time range, and for mixed files the hosts, of every block.
+    """
+    compressed = path.endswith(".gz")
+    st = os.stat(path)
+    index = _load_index(path, st)
+    blocks = [Block(**b) for b in index["blocks"]] if index else []
+    indexed = index["indexed"] if index else 0
+    if indexed < st.st_size:
+        scan = _index_gzip if compressed else _index_plain
+        with open(path, "rb") as f:
+            added, pos = scan(f, indexed, host is None)
+        blocks.extend(added)
+        if pos != indexed:
+            payload = {
+                "version": INDEX_VERSION,
+                "inode": st.st_ino,
+                "indexed": pos,
+                "blocks": [asdict(b) for b in blocks],
+            }
+            try:
+                write_atomic(path + INDEX_SUFFIX, json.dumps(payload).encode())
+            except OSError:
+                # Read only stores are still queried, just not indexed on disk.
+                pass
+    return Segment(path=path, host=host, compressed=compressed, blocks=blocks)
+
+
+@dataclass
+class Query:
+    since: Optional[float] = None
+    until: Optional[float] = None
+    hosts: Set[str] = field(default_factory=set)
+    grep: Optional[bytes] = None
+
+    def match(self, line: bytes, host: Optional[str]) -> Tuple[bool, Optional[float]]:
+        if not line or (self.grep and self.grep not in line):
+            return False, None
+        if self.hosts and (host or line_host(line)) not in self.hosts:
+            return False, None
+        ts = line_time(line)
+        if self.since is not None or self.until is not None:
+            if ts is None:
+                return False, None
+            if (self.since is not None and ts < self.since) or (
+                self.until is not None and ts >= self.until
+            ):
+                return False, ts
+        return True, ts
+
+
+def scan_block(
+    path: str, block: Block, compressed: bool, host: Optional[str], query: Query
+) -> List[Tuple[float, bytes]]:
+    matches = []
+    with open(path, "rb") as f:
+        chunks = read_range(f, block.offset, block.length)
+        for line in split_lines(
+            inflate(chunks) if compressed else chunks, query.grep
+        ):
+            ok, ts = query.match(line, host)
+            if ok:
+                matches.append((ts or 0.0, line))
+    matches.sort(key=lambda m: m[0])
+    return matches
+
+
+def _scan(task):
+    return scan_block(*task)
+
+
+def query_logs(
+    root: str, query: Query, workers: Optional[int] = None
+) -> List[Tuple[float, bytes]]:
+    """Return the records under ``root`` matching ``query`` ordered by time.
+
+    Only blocks whose indexed time range and hosts can match are read, and
+    they are decompressed and filtered in parallel worker processes.
+    """
+    candidates = [
+        (path, host)
+        for path, host in find_segments(root)
+        if not query.hosts or host is None or host in query.hosts
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        segments = list(pool.map(index_segment, *zip(*candidates))) if candidates else []
+        tasks = [
+            (s.path, b, s.compressed, s.host, query)
+            for s in segments
+            for b in s.blocks
+            if b.overlaps(query.since, query.until)
+            and (not query.hosts or s.host or query.hosts & set(b.hosts))
+        ]
+        tasks.sort(key=lambda t: t[1].start or 0.0)
+        matches = [m for found in pool.map(_scan, tasks) for m in found]
+    matches.sort(key=lambda m: m[0])
+    return matches
+
+
+def format_record(line: bytes) -> str:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line.decode(errors="replace")
+    ts = line_time(line)
+    when = (
+        datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+        if ts is not None
+        else "-"
+    )
+    unit = record.get("SYSLOG_IDENTIFIER") or record.get("_SYSTEMD_UNIT") or "-"
+    return f"{when} {record.get('_HOSTNAME', '-')} {unit}: {record.get('MESSAGE', '')}"
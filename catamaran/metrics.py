@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+METRICS_FILE_ENV = "CATAMARAN_METRICS_FILE"
+
+
+def max_rss_bytes(who: int = resource.RUSAGE_SELF) -> int:
+    """Peak resident set size of this process, or of its waited children."""
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Metrics:
+    """Named phase timings and counters of one module run.
+
+    Phases are accumulated, so a phase entered once per upload reports the
+    total time and how often it ran. Nested or concurrent phases overlap, the
+    sum of the phases is not the run time. Safe to use from threads.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.monotonic()
+        self.phases: Dict[str, Dict] = {}
+        self.counters: Dict[str, int] = {}
+        self._open: Dict[int, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            phase = self.phases.setdefault(name, {"seconds": 0.0, "count": 0})
+            phase["seconds"] += seconds
+            phase["count"] += 1
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        token = object()
+        with self._lock:
+            self._open[id(token)] = (name, start)
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._open[id(token)]
+            self.record(name, time.monotonic() - start)
+
+    def merge(self, data: Dict):
+        """Add the phases and counters of another run's ``to_dict``."""
+        for name, phase in data.get("phases", {}).items():
+            with self._lock:
+                mine = self.phases.setdefault(name, {"seconds": 0.0, "count": 0})
+                mine["seconds"] += phase["seconds"]
+                mine["count"] += phase["count"]
+        for name, value in data.get("counters", {}).items():
+            self.count(name, value)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            phases = {name: dict(p) for name, p in self.phases.items()}
+            # A module failing inside a phase exits before the phase ends.
+            for name, start in self._open.values():
+                phase = phases.setdefault(name, {"seconds": 0.0, "count": 0})
+                phase["seconds"] += now - start
+                phase["count"] += 1
+            counters = dict(self.counters)
+        for phase in phases.values():
+            phase["seconds"] = round(phase["seconds"], 3)
+        return {
+            "seconds": round(now - self.start, 3),
+            "phases": phases,
+            "counters": counters,
+            "max_rss_bytes": max_rss_bytes(),
+            "children_max_rss_bytes": max_rss_bytes(resource.RUSAGE_CHILDREN),
+        }
+
+    def write(self, task: str, failed: bool = False, path: Optional[str] = None) -> Optional[str]:
+        """Append the metrics as a JSON line to ``path`` or ``$CATAMARAN_METRICS_FILE``.
+
+        Returns the path written, or None when no file is configured or it
+        cannot be written. Lines are written with a single ``write`` on a file
+        opened for appending, so concurrent modules do not interleave.
+        """
+        path = path or os.getenv(METRICS_FILE_ENV)
+        if not path:
+            return None
+        line = json.dumps(
+            {"task": task, "time": round(time.time(), 3), "failed": failed, **self.to_dict()},
+            sort_keys=True,
+        )
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (line + "\n").encode())
+            finally:
+                os.close(fd)
+        except OSError:
+            return None
+        return path
@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+import os
+import platform
+import time
+from typing import Dict, List, Optional
+
+import docker
+from docker.errors import APIError, NotFound
+
+from catamaran.metrics import Metrics
+
+
+def get_docker_socket():
+    system = platform.system().lower()
+    if system == "windows":
+        return "npipe:////./pipe/docker_engine"
+    elif system == "linux":
+        return "unix:///var/run/docker.sock"
+    elif system == "darwin":
+        home_path = os.getenv("HOME")
+        return f"unix://{home_path}/.docker/run/docker.sock"
+    else:
+        raise RuntimeError(f"Unsupported OS: {system}")
+
+
+def docker_client() -> docker.APIClient:
+    return docker.APIClient(base_url=os.getenv("DOCKER_SOCK", get_docker_socket()))
+
+
+def image_registry(image: str) -> str:
+    first, sep, _ = image.partition("/")
+    if sep and ("." in first or ":" in first or first == "localhost"):
+        return first
+    return "docker.io"
+
+
+@dataclass
+class PullReport:
+    image: str
+    pulled: bool = False
+    local_digest: Optional[str] = None
+    remote_digest: Optional[str] = None
+    bytes: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def local_digests(client: docker.APIClient, image: str) -> List[str]:
+    try:
+        repo_digests = client.inspect_image(image).get("RepoDigests") or []
+    except NotFound:
+        return []
+    return [d.split("@", 1)[1] for d in repo_digests if "@" in d]
+
+
+def remote_digest(
+    client: docker.APIClient, image: str, auth_config: Optional[Dict] = None
+) -> str:
+    return client.inspect_distribution(image, auth_config=auth_config)["Descriptor"][
+        "digest"
+    ]
+
+
+def pull(
+    client: docker.APIClient, image: str, auth_config: Optional[Dict] = None
+) -> int:
+    """Pull an image and return the number of layer bytes downloaded."""
+    layers: Dict[str, int] = {}
+    for line in client.pull(image, stream=True, decode=True, auth_config=auth_config):
+        if "error" in line:
+            raise APIError(line["error"])
+        if line.get("status") == "Downloading":
+            total = line.get("progressDetail", {}).get("total", 0)
+            layers[line["id"]] = max(layers.get(line["id"], 0), total)
+    return sum(layers.values())
+
+
+def prefetch_image(
+    image: str, auth_config: Optional[Dict], check_only: bool = False
+) -> PullReport:
+    report = PullReport(image=image)
+    start = time.monotonic()
+    # APIClient is not thread safe, each worker talks to the daemon on its own.
+    client = docker_client()
+    try:
+        local = local_digests(client, image)
+        report.local_digest = local[0] if local else None
+        report.remote_digest = remote_digest(client, image, auth_config)
+        if report.remote_digest not in local:
+            report.pulled = True
+            if not check_only:
+                report.bytes = pull(client, image, auth_config)
+    except APIError as e:
+        report.error = str(e)
+    finally:
+        client.close()
+        report.seconds = round(time.monotonic() - start, 3)
+    return report
+
+
+def prefetch(
+    images: List[str],
+    username: Optional[str] = None,
+    password: Optional[str] = None,
+    registry: str = "ghcr.io",
+    parallel: int = 4,
+    check_only: bool = False,
+) -> List[PullReport]:
+    """Pull the images whose local digest differs from the registry, concurrently.
+
+    Credentials are verified with a single login and then passed along to the
+    requests against ``registry`` only.
+    """
+    auth_config = None
+    if username and password:
+        client = docker_client()
+        try:
+            client.login(username=username, password=password, registry=registry)
+        finally:
+            client.close()
+        auth_config = {"username": username, "password": password}
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        futures = [
+            pool.submit(
+                prefetch_image,
+                image,
+                auth_config if image_registry(image) == registry else None,
+                check_only,
+            )
+            for image in images
+        ]
+        return [future.result() for future in futures]
+
+
+def build_image(
+    client: docker.APIClient,
+    image: str,
+    context: str,
+    dockerfile: str,
+    metrics: Optional[Metrics] = None,
+):
+    """Build ``image`` from ``context``, raising ``RuntimeError`` on build errors."""
+    metrics = metrics or Metrics()
+    # The context is archived and sent before the build call returns.
+    with metrics.phase("context"):
+        logs = client.build(
+            path=context,
+            dockerfile=dockerfile,
+            tag=image,
+            rm=True,
+            pull=True,
+            decode=True,
+        )
+    with metrics.phase("build"):
+        for line in logs:
+            if "error" in line:
+                raise RuntimeError(f"Build error: {line.get('error')}")
+
+
+def push_image(
+    client: docker.APIClient,
+    repository: str,
+    tag: str,
+    metrics: Optional[Metrics] = None,
+) -> int:
+    """Push ``repository:tag`` and return the bytes of the layers sent."""
+    metrics = metrics or Metrics()
+    pushed: Dict[str, int] = {}
+    with metrics.phase("push"):
+        for line in client.push(repository=repository, tag=tag, stream=True, decode=True):
+            if "error" in line:
+                raise RuntimeError(f"Push error: {line.get('error')}")
+            progress = line.get("progressDetail") or {}
+            if "id" in line and "current" in progress:
+                pushed[line["id"]] = progress["current"]
+    metrics.count("pushed_bytes", sum(pushed.values()))
+    return sum(pushed.values())
@@ -0,0 +1,239 @@
+from dataclasses import dataclass, asdict
+import hashlib
+import json
+import os
+import tempfile
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from catamaran.metrics import Metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+DEFAULT_CACHE_DIR = "~/.cache/catamaran/releases"
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass
+class FetchResult:
+    tag: str
+    asset: str
+    asset_id: int
+    digest: str
+    path: str
+    downloaded: bool = False
+    installed: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def match_asset(assets: List[Dict], patterns: List[str]) -> Dict:
+    """Pick the single asset whose name contains every pattern, like eget -a.
+
+    A pattern starting with ``^`` excludes assets containing the rest of it.
+    """
+    candidates = [
+        asset
+        for asset in assets
+        if all(
+            (p[1:] not in asset["name"]) if p.startswith("^") else (p in asset["name"])
+            for p in patterns
+        )
+    ]
+    if len(candidates) != 1:
+        names = [asset["name"] for asset in candidates or assets]
+        raise ValueError(
+            f"Expected exactly one asset matching {patterns}, candidates: {names}"
+        )
+    return candidates[0]
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return f"sha256:{sha.hexdigest()}"
+
+
+class ReleaseCache:
+    """Content addressed store of release assets.
+
+    ``blobs/sha256/<hex>`` holds the asset bodies, ``assets/<id>`` maps an asset
+    ID to its digest and ``releases/<owner>_<repo>.json`` keeps the last
+    release payload with its ETag for conditional requests.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.root = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
+        for sub in ("blobs/sha256", "assets", "releases"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", "sha256", digest.split(":", 1)[1])
+
+    def asset_digest(self, asset_id: int) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "assets", str(asset_id))) as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return digest if os.path.exists(self.blob_path(digest)) else None
+
+    def remember_asset(self, asset_id: int, digest: str):
+        write_atomic(os.path.join(self.root, "assets", str(asset_id)), digest.encode())
+
+    def _release_file(self, repo: str) -> str:
+        return os.path.join(self.root, "releases", repo.replace("/", "_") + ".json")
+
+    def release(self, repo: str) -> Optional[Dict]:
+        try:
+            with open(self._release_file(repo)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def remember_release(self, repo: str, etag: Optional[str], release: Dict):
+        payload = json.dumps({"etag": etag, "release": release})
+        write_atomic(self._release_file(repo), payload.encode())
+
+
+def write_atomic(path: str, data: bytes, mode: int = 0o644):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def install_atomic(src: str, dest: str, mode: int = 0o755) -> bool:
+    """Copy ``src`` over ``dest`` with a rename. Returns False if already equal."""
+    if os.path.exists(dest) and file_digest(dest) == file_digest(src):
+        if (os.stat(dest).st_mode & 0o7777) != mode:
+            os.chmod(dest, mode)
+        return False
+    directory = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(dest)}.")
+    try:
+        with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                out.write(chunk)
+        os.chmod(tmp, mode)
+        os.replace(tmp, dest)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+class ReleaseFetcher:
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        client: Optional["httpx.Client"] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.cache = ReleaseCache(cache_dir)
+        self.metrics = metrics or Metrics()
+        headers = {"Accept": "application/vnd.github.v3+json"}
+        if token:
+            headers["Authorization"] = f"token {token}"
+        if client is None:
+            import httpx
+
+            client = httpx.Client(
+                base_url="https://api.github.com",
+                headers=headers,
+                follow_redirects=True,
+                timeout=300,
+            )
+        self.client = client
+
+    def close(self):
+        self.client.close()
+
+    def latest_release(self, repo: str) -> Dict:
+        cached = self.cache.release(repo)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        response = self.client.get(f"/repos/{repo}/releases/latest", headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["release"]
+        response.raise_for_status()
+        release = response.json()
+        self.cache.remember_release(repo, response.headers.get("ETag"), release)
+        return release
+
+    def download(self, asset: Dict) -> str:
+        """Stream an asset into the blob store and return its digest."""
+        expected = asset.get("digest")
+        fd, tmp = tempfile.mkstemp(dir=self.cache.root, prefix=".download")
+        sha = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as out, self.client.stream(
+                "GET",
+                asset["url"],
+                headers={"Accept": "application/octet-stream"},
+            ) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    sha.update(chunk)
+                    out.write(chunk)
+                    self.metrics.count("downloaded_bytes", len(chunk))
+            digest = f"sha256:{sha.hexdigest()}"
+            if expected and expected != digest:
+                raise ValueError(
+                    f"Checksum mismatch for {asset['name']}: expected {expected}, got {digest}"
+                )
+            os.replace(tmp, self.cache.blob_path(digest))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.cache.remember_asset(asset["id"], digest)
+        return digest
+
+    def fetch(
+        self,
+        repo: str,
+        patterns: List[str],
+        dest: str,
+        mode: int = 0o755,
+        dry_run: bool = False,
+    ) -> FetchResult:
+        with self.metrics.phase("release"):
+            release = self.latest_release(repo)
+        asset = match_asset(release.get("assets", []), patterns)
+        digest = self.cache.asset_digest(asset["id"])
+        result = FetchResult(
+            tag=release.get("tag_name", ""),
+            asset=asset["name"],
+            asset_id=asset["id"],
+            digest=digest or "",
+            path=dest,
+        )
+        if dry_run:
+            result.downloaded = not digest
+            result.installed = (
+                not digest
+                or not os.path.exists(dest)
+                or file_digest(dest) != digest
+            )
+            return result
+        if not digest:
+            with self.metrics.phase("download"):
+                result.digest = self.download(asset)
+            result.downloaded = True
+        with self.metrics.phase("install"):
+            result.installed = install_atomic(
+                self.cache.blob_path(result.digest), dest, mode
+            )
+        return result
@@ -0,0 +1,286 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from fnmatch import fnmatch
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from catamaran.artifacts import cached_digest
+from catamaran.releases import write_atomic
+
+DEFAULT_CACHE_DIR = "~/.cache/catamaran/steps"
+DEFAULT_MAX_SIZE = 2 << 30
+KEY_VERSION = 1
+
+
+@dataclass
+class Step:
+    """A command whose ``outputs`` only depend on its declared inputs.
+
+    ``inputs`` and ``outputs`` are fnmatch patterns matched against paths
+    relative to the working directory, where ``*`` also crosses directories.
+    Inputs prefixed with ``!`` are excluded and absolute inputs are globbed
+    as is. ``env`` names environment variables and ``tools`` commands, such
+    as ``go version``, whose values are part of the key.
+    """
+
+    name: str
+    command: str
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    env: List[str] = field(default_factory=list)
+    tools: List[str] = field(default_factory=list)
+
+
+@dataclass
+class StepReport:
+    name: str
+    key: str = ""
+    hit: bool = False
+    rc: int = 0
+    seconds: float = 0.0
+    saved_seconds: float = 0.0
+    files: int = 0
+    stdout: str = ""
+    stderr: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _matches(path: str, patterns: List[str]) -> bool:
+    return any(fnmatch(path, p) for p in patterns)
+
+
+def expand(cwd: str, patterns: List[str], exclude: Optional[List[str]] = None) -> List[str]:
+    """Files under ``cwd`` matching ``patterns``, as sorted relative paths."""
+    include = [p for p in patterns if not p.startswith("!") and not os.path.isabs(p)]
+    exclude = (exclude or []) + [p[1:] for p in patterns if p.startswith("!")]
+    found: Set[str] = set()
+    for p in patterns:
+        if os.path.isabs(p):
+            found.update(f for f in glob.glob(p, recursive=True) if os.path.isfile(f))
+    if include:
+        for directory, dirs, files in os.walk(cwd):
+            rel = os.path.relpath(directory, cwd)
+            rel = "" if rel == "." else rel + "/"
+            # Prune excluded trees such as .git/** without walking them.
+            dirs[:] = sorted(d for d in dirs if not _matches(f"{rel}{d}/-", exclude))
+            for name in files:
+                path = rel + name
+                if _matches(path, include) and not _matches(path, exclude):
+                    found.add(path)
+    return sorted(found)
+
+
+def _tool_version(command: str, cwd: str) -> str:
+    proc = subprocess.run(
+        command, shell=True, cwd=cwd, capture_output=True, text=True, timeout=60
+    )
+    return f"{proc.returncode} {proc.stdout.strip()} {proc.stderr.strip()}"
+
+
+def step_key(step: Step, cwd: str, workers: int = 8) -> str:
+    """Hash the command, inputs, environment and tool versions of a step.
+
+    Files are hashed concurrently and their digests remembered by size and
+    mtime, so unchanged trees cost one ``stat`` per file.
+    """
+    files = expand(cwd, step.inputs, exclude=step.outputs)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tools = pool.map(lambda t: _tool_version(t, cwd), step.tools)
+        digests = pool.map(
+            lambda f: cached_digest(f if os.path.isabs(f) else os.path.join(cwd, f)),
+            files,
+        )
+        payload = {
+            "version": KEY_VERSION,
+            "name": step.name,
+            "command": step.command,
+            "env": {k: os.environ.get(k) for k in sorted(step.env)},
+            "tools": dict(zip(step.tools, tools)),
+            "files": list(zip(files, digests)),
+        }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class StepCache:
+    """Content addressed store of step outputs with size based LRU eviction.
+
+    ``entries/<key>.json`` lists the output files of a step run with their
+    digests and ``blobs/<digest>`` holds the file contents, shared between
+    entries. The mtime of an entry is its last use.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.root = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_size = max_size
+        for sub in ("entries", "blobs"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        # Evicting must not collect the blobs of an entry still being stored.
+        with open(os.path.join(self.root, "lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, "entries", f"{key}.json")
+
+    def _blob(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._entry(key)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not all(os.path.exists(self._blob(d)) for _, d, _ in entry["files"]):
+            return None
+        os.utime(self._entry(key))
+        return entry
+
+    def restore(self, entry: Dict, cwd: str) -> int:
+        """Write the outputs of an entry into ``cwd``, skipping identical files."""
+        restored = 0
+        for rel, digest, mode in entry["files"]:
+            dest = os.path.join(cwd, rel)
+            if os.path.exists(dest) and cached_digest(dest) == digest:
+                continue
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            tmp = f"{dest}.{os.getpid()}.tmp"
+            shutil.copyfile(self._blob(digest), tmp)
+            os.chmod(tmp, mode)
+            os.replace(tmp, dest)
+            restored += 1
+        return restored
+
+    def store(self, key: str, name: str, cwd: str, outputs: List[str], seconds: float) -> int:
+        with self._locked():
+            return self._store(key, name, cwd, outputs, seconds)
+
+    def _store(self, key: str, name: str, cwd: str, outputs: List[str], seconds: float) -> int:
+        files = []
+        for rel in expand(cwd, outputs):
+            path = os.path.join(cwd, rel)
+            digest = cached_digest(path)
+            blob = self._blob(digest)
+            if not os.path.exists(blob):
+                tmp = f"{blob}.{os.getpid()}.tmp"
+                shutil.copyfile(path, tmp)
+                os.replace(tmp, blob)
+            files.append((rel, digest, os.stat(path).st_mode & 0o7777))
+        entry = {"name": name, "key": key, "seconds": seconds, "files": files}
+        write_atomic(self._entry(key), json.dumps(entry).encode())
+        self.evict()
+        return len(files)
+
+    def evict(self) -> None:
+        """Drop the least recently used entries until the blobs fit ``max_size``."""
+        entries: List[Tuple[float, str, List[str]]] = []
+        for name in os.listdir(os.path.join(self.root, "entries")):
+            path = os.path.join(self.root, "entries", name)
+            try:
+                with open(path) as f:
+                    digests = [d for _, d, _ in json.load(f)["files"]]
+                entries.append((os.stat(path).st_mtime, path, digests))
+            except (FileNotFoundError, ValueError, KeyError):
+                continue
+        sizes = {}
+        for digest in os.listdir(os.path.join(self.root, "blobs")):
+            if not digest.endswith(".tmp"):
+                sizes[digest] = os.stat(self._blob(digest)).st_size
+        refs: Dict[str, int] = {}
+        for _, _, digests in entries:
+            for d in set(digests):
+                refs[d] = refs.get(d, 0) + 1
+        # Blobs of entries that were evicted or never completed.
+        total = 0
+        for digest, size in sizes.items():
+            if digest in refs:
+                total += size
+            else:
+                os.unlink(self._blob(digest))
+        for _, path, digests in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.unlink(path)
+            for d in set(digests):
+                refs[d] -= 1
+                if refs[d] == 0 and d in sizes:
+                    os.unlink(self._blob(d))
+                    total -= sizes[d]
+
+
+def run_step(
+    step: Step, cwd: str, cache: StepCache, force: bool = False, lookup_only: bool = False
+) -> StepReport:
+    """Restore the outputs of ``step`` from ``cache`` or run it.
+
+    With ``lookup_only`` a miss returns a report that is not a hit without
+    running the command.
+    """
+    report = StepReport(name=step.name)
+    start = time.monotonic()
+    report.key = step_key(step, cwd)
+    entry = None if force else cache.lookup(report.key)
+    if entry is not None:
+        try:
+            report.files = cache.restore(entry, cwd)
+        except FileNotFoundError:
+            # Evicted by a concurrent run between lookup and restore.
+            entry = None
+    if entry is not None:
+        report.hit = True
+        report.seconds = round(time.monotonic() - start, 3)
+        report.saved_seconds = round(max(0.0, entry["seconds"] - report.seconds), 3)
+        return report
+    if lookup_only:
+        return report
+    proc = subprocess.run(step.command, shell=True, cwd=cwd, capture_output=True, text=True)
+    report.rc, report.stdout, report.stderr = proc.returncode, proc.stdout, proc.stderr
+    report.seconds = round(time.monotonic() - start, 3)
+    if proc.returncode == 0:
+        report.files = cache.store(report.key, step.name, cwd, step.outputs, report.seconds)
+    return report
+
+
+def run_steps(
+    steps: List[Step],
+    cwd: str,
+    cache: StepCache,
+    parallel: bool = True,
+    force: bool = False,
+) -> List[StepReport]:
+    """Run the steps, concurrently when ``parallel``, restoring cached outputs.
+
+    Sequential runs stop at the first failing step. A hit only restores the
+    outputs of a step, so when a later step misses the earlier hits run again
+    first for the side effects it may depend on, such as installed packages.
+    """
+    if parallel:
+        with ThreadPoolExecutor(max_workers=max(1, len(steps))) as pool:
+            return list(pool.map(lambda s: run_step(s, cwd, cache, force), steps))
+    reports: List[StepReport] = []
+    for step in steps:
+        report = run_step(step, cwd, cache, force, lookup_only=True)
+        if not report.hit:
+            for i, earlier in enumerate(reports):
+                if earlier.hit:
+                    reports[i] = run_step(steps[i], cwd, cache, force=True)
+                    if reports[i].rc != 0:
+                        return reports[: i + 1]
+            report = run_step(step, cwd, cache, force)
+        reports.append(report)
+        if report.rc != 0:
+            break
+    return reports
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from catamaran.releases import write_atomic
+
+DEFAULT_DIR = "/var/lib/node_exporter/textfile"
+
+METRICS = (
+    ("duration_seconds", "Duration of the last run of a catamaran task."),
+    ("success", "Whether the last run of a catamaran task succeeded."),
+    ("last_run_timestamp_seconds", "End of the last run of a catamaran task."),
+)
+
+
+def textfile_dir() -> str:
+    return os.getenv("CATAMARAN_TEXTFILE_DIR", DEFAULT_DIR)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(task: str, seconds: float, success: bool, labels: Dict[str, str]) -> str:
+    selector = ",".join(
+        f'{k}="{_escape(str(v))}"' for k, v in {"task": task, **labels}.items()
+    )
+    values = (round(seconds, 3), int(success), round(time.time(), 3))
+    lines = []
+    for (name, text), value in zip(METRICS, values):
+        lines += [
+            f"# HELP catamaran_task_{name} {text}",
+            f"# TYPE catamaran_task_{name} gauge",
+            f"catamaran_task_{name}{{{selector}}} {value}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_run(
+    task: str,
+    seconds: float,
+    success: bool,
+    labels: Optional[Dict[str, str]] = None,
+    directory: Optional[str] = None,
+) -> Optional[str]:
+    """Write the outcome of a task for the node_exporter textfile collector.
+
+    Returns the written path, or None when the collector directory does not
+    exist on this host.
+    """
+    directory = directory or textfile_dir()
+    if not os.path.isdir(directory):
+        return None
+    path = os.path.join(directory, f"catamaran_{re.sub(r'[^A-Za-z0-9_]', '_', task)}.prom")
+    try:
+        write_atomic(path, render(task, seconds, success, labels or {}).encode())
+    except OSError:
+        return None
+    return path
+
+
+@contextmanager
+def recorded(task: str, labels: Optional[Dict[str, str]] = None):
+    """Record the duration and outcome of the wrapped block.
+
+    Ansible modules leave through ``exit_json``/``fail_json``, so a
+    ``SystemExit`` with a zero code counts as success.
+    """
+    start = time.monotonic()
+    success = False
+    try:
+        yield
+        success = True
+    except SystemExit as e:
+        success = not e.code
+        raise
+    finally:
+        write_run(task, time.monotonic() - start, success, labels)
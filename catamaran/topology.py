@@ -0,0 +1,143 @@
+from dataclasses import dataclass, field, asdict
+import hashlib
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+
+def parse_node(host: str) -> Tuple[str, str, int]:
+    """Split ``shard-b-2.example.com`` into node type, replica and shard.
+
+    Mirrors ``z_node_type``, ``z_replica`` and ``z_shard`` of ``z_defaults``.
+    """
+    parts = host.split(".")[0].strip().split("-")
+    node_type = parts[0]
+    replica = parts[1] if len(parts) > 1 else ""
+    shard = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
+    return node_type, replica, shard
+
+
+def rolling_batches(hosts: List[str], batch_size: int = 0) -> List[List[str]]:
+    """Group hosts by replica, then split every group into batches.
+
+    Restarting one replica group at a time keeps the other replicas of every
+    shard serving. A ``batch_size`` of 0 restarts a whole group at once.
+    """
+
+    def group_of(host):
+        return parse_node(host)[:2]
+
+    batches: List[List[str]] = []
+    ordered = sorted(hosts, key=lambda h: (group_of(h), parse_node(h)[2], h))
+    for _, group in groupby(ordered, key=group_of):
+        members = list(group)
+        size = batch_size if batch_size > 0 else len(members)
+        batches.extend(members[i : i + size] for i in range(0, len(members), size))
+    return batches
+
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+DEFAULT_BUCKETS = 1024
+
+
+def shard_host(node_type: str, replica: str, shard: int, domain: str) -> str:
+    """Inverse of :func:`parse_node`, matching the names built by ``z_add_shards``."""
+    suffix = f"-{shard}" if shard > 0 else ""
+    return f"{node_type}-{replica}{suffix}.{domain}"
+
+
+def _score(bucket: int, shard: int) -> int:
+    digest = hashlib.blake2b(f"{bucket}:{shard}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def bucket_owners(num_shards: int, buckets: int = DEFAULT_BUCKETS) -> List[int]:
+    """Place hash buckets onto shards with rendezvous hashing.
+
+    Adding a shard only moves the buckets the new shard wins, removing one only
+    moves the buckets it owned, so changing the shard count moves the minimum
+    amount of data instead of reshuffling the whole key space.
+    """
+    if num_shards < 1:
+        raise ValueError("num_shards must be at least 1")
+    return [
+        max(range(num_shards), key=lambda shard: _score(bucket, shard))
+        for bucket in range(buckets)
+    ]
+
+
+@dataclass
+class HostPlan:
+    shard: int
+    replica: str
+    action: str
+    buckets: int = 0
+    buckets_in: Dict[int, int] = field(default_factory=dict)
+    buckets_out: Dict[int, int] = field(default_factory=dict)
+
+
+@dataclass
+class ShardPlan:
+    num_shards: int
+    previous_num_shards: Optional[int]
+    moved_buckets: int = 0
+    moves: List[Dict[str, int]] = field(default_factory=list)
+    hosts: Dict[str, HostPlan] = field(default_factory=dict)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def plan_shards(
+    domain: str,
+    num_shards: int,
+    shard_size: int,
+    previous_num_shards: Optional[int] = None,
+    node_type: str = "shard",
+    buckets: int = DEFAULT_BUCKETS,
+) -> ShardPlan:
+    """Plan the move from ``previous_num_shards`` to ``num_shards``.
+
+    Every replica host gets an action: ``join`` for hosts of new shards (or of
+    every shard when there is no previous topology), ``rebalance`` for hosts
+    whose shard gains or loses buckets, ``keep`` for untouched hosts and
+    ``leave`` for hosts of removed shards.
+    """
+    new = bucket_owners(num_shards, buckets)
+    old = bucket_owners(previous_num_shards, buckets) if previous_num_shards else None
+
+    moves: Dict[Tuple[int, int], int] = {}
+    if old is not None:
+        for before, after in zip(old, new):
+            if before != after:
+                moves[(before, after)] = moves.get((before, after), 0) + 1
+
+    plan = ShardPlan(
+        num_shards=num_shards,
+        previous_num_shards=previous_num_shards,
+        moved_buckets=sum(moves.values()),
+        moves=[
+            {"from": before, "to": after, "buckets": count}
+            for (before, after), count in sorted(moves.items())
+        ],
+    )
+    for shard in range(max(num_shards, previous_num_shards or 0)):
+        buckets_in = {b: c for (b, a), c in moves.items() if a == shard}
+        buckets_out = {a: c for (b, a), c in moves.items() if b == shard}
+        if shard >= num_shards:
+            action = "leave"
+        elif previous_num_shards is None or shard >= previous_num_shards:
+            action = "join"
+        elif buckets_in or buckets_out:
+            action = "rebalance"
+        else:
+            action = "keep"
+        for replica in LETTERS[:shard_size]:
+            plan.hosts[shard_host(node_type, replica, shard, domain)] = HostPlan(
+                shard=shard,
+                replica=replica,
+                action=action,
+                buckets=new.count(shard) if shard < num_shards else 0,
+                buckets_in=buckets_in,
+                buckets_out=buckets_out,
+            )
+    return plan
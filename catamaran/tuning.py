@@ -0,0 +1,57 @@
+import re
+from typing import Dict, List, Optional
+
+THP_RE = re.compile(r"\[(\w+)\]")
+
+
+def tuning_profile(
+    profiles: Dict[str, Dict], name: str, overrides: Optional[Dict] = None
+) -> Dict:
+    """Resolve a tuning profile, following ``extends`` and merging ``sysctls``.
+
+    ``overrides`` is applied last, so hosts can adjust single settings of a
+    profile without copying it.
+    """
+    chain: List[Dict] = []
+    seen = set()
+    while name:
+        if name in seen:
+            raise ValueError(f"Tuning profile {name} extends itself")
+        if name not in profiles:
+            raise ValueError(f"Unknown tuning profile {name}")
+        seen.add(name)
+        chain.append(profiles[name])
+        name = profiles[name].get("extends", "")
+    resolved: Dict = {"sysctls": {}}
+    for profile in list(reversed(chain)) + [overrides or {}]:
+        for key, value in profile.items():
+            if key == "sysctls":
+                resolved["sysctls"].update(value or {})
+            elif key != "extends":
+                resolved[key] = value
+    return resolved
+
+
+def parse_state(lines: List[str]) -> Dict[str, str]:
+    """Parse ``key=value`` lines, normalising whitespace and THP selections.
+
+    Kernel settings with several fields are printed tab separated by
+    ``sysctl``, and THP files list every mode with the active one bracketed.
+    """
+    state = {}
+    for line in lines:
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        m = THP_RE.search(value)
+        state[key.strip()] = m.group(1) if m else " ".join(value.split())
+    return state
+
+
+def state_changes(before: Dict[str, str], after: Dict[str, str]) -> List[str]:
+    """Describe the settings that differ, as ``key: before -> after``."""
+    return [
+        f"{key}: {before.get(key) or '-'} -> {after.get(key) or '-'}"
+        for key in sorted(set(before) | set(after))
+        if before.get(key) != after.get(key)
+    ]
@@ -0,0 +1,51 @@
+import os
+from typing import Dict, List, Optional
+
+
+def udev_match(device: str) -> str:
+    """Match a device in udev rules by its stable link or its kernel name."""
+    if device.startswith("/dev/disk/"):
+        return f'SYMLINK=="{device[len("/dev/"):]}"'
+    return f'KERNEL=="{os.path.basename(device)}"'
+
+
+def volume_plan(
+    attached_volumes: Dict[str, str],
+    specs: Optional[List[Dict]] = None,
+    profiles: Optional[Dict[str, Dict]] = None,
+    default_profile: str = "default",
+    default_filesystem: str = "ext4",
+) -> List[Dict]:
+    """Resolve the settings of every attached volume from its profile.
+
+    ``attached_volumes`` maps volume names to devices as set by ``z_nodes``,
+    ``specs`` are the volume entries of ``z_nodes`` with an optional
+    ``profile`` and ``filesystem``. Profile options that differ between
+    filesystems, ``mkfs_opts`` and ``mount_opts``, are keyed by filesystem.
+    """
+    profiles = profiles or {}
+    by_name = {spec["name"]: spec for spec in specs or [] if "name" in spec}
+    plan = []
+    for name, device in sorted((attached_volumes or {}).items()):
+        spec = by_name.get(name, {})
+        profile_name = spec.get("profile", default_profile)
+        if profile_name not in profiles:
+            raise ValueError(f"Unknown volume profile {profile_name} for {name}")
+        profile = profiles[profile_name]
+        filesystem = spec.get("filesystem", default_filesystem)
+        plan.append(
+            {
+                "name": name,
+                "device": device,
+                "mount_point": f"/mnt/{name}",
+                "filesystem": filesystem,
+                "profile": profile_name,
+                "mkfs_opts": profile.get("mkfs_opts", {}).get(filesystem, ""),
+                "mount_opts": profile.get("mount_opts", {}).get(filesystem, "defaults"),
+                "readahead_kb": profile.get("readahead_kb"),
+                "scheduler": profile.get("scheduler"),
+                "fstrim": bool(profile.get("fstrim", False)),
+                "udev_match": udev_match(device),
+            }
+        )
+    return plan
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+
+import httpx
+import pytest
+
+from catamaran import agent
+from catamaran.agent import Agent, AgentError, alive, call, delegate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def running(tmp_path):
+    path = str(tmp_path / "agent.sock")
+    server = Agent(path, idle=60)
+    thread = threading.Thread(target=asyncio.run, args=(server.serve(),))
+    thread.start()
+    while not alive(path):
+        pass
+    yield server
+    call("shutdown", path=path)
+    thread.join(5)
+    assert not os.path.exists(path)
+
+
+def test_ping_and_unknown_operation(running):
+    assert call("ping", path=running.path)["pid"] == os.getpid()
+    with pytest.raises(AgentError, match="Unknown agent operation"):
+        call("nope", path=running.path)
+
+
+def test_resolve_is_cached(running):
+    first = call("resolve", path=running.path, host="localhost")
+    second = call("resolve", path=running.path, host="localhost")
+    assert first["address"] == second["address"] == "127.0.0.1"
+    assert (first["cached"], second["cached"]) == (False, True)
+
+
+def test_delete_image_reuses_the_client(running):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.method == "GET":
+            version = {"id": 7, "name": "sha256:a", "metadata": {"container": {"tags": ["v1"]}}}
+            return httpx.Response(200, json=[version])
+        return httpx.Response(204)
+
+    running.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    for _ in range(2):
+        result = call(
+            "delete_image", path=running.path, tag="v1", image_name="ark", username="evg", token="t"
+        )
+        assert result["metrics"]["phases"]["delete"]["count"] == 1
+    assert [r.method for r in requests] == ["GET", "DELETE", "GET", "DELETE"]
+
+
+def test_delegate_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.delenv(agent.AGENT_ENV, raising=False)
+    monkeypatch.setenv(agent.SOCKET_ENV, str(tmp_path / "agent.sock"))
+    assert delegate("ping") is None
+    assert not os.path.exists(tmp_path / "agent.sock")
+
+
+def test_delegate_starts_the_agent(tmp_path, monkeypatch):
+    path = str(tmp_path / "agent.sock")
+    monkeypatch.setenv(agent.AGENT_ENV, "1")
+    monkeypatch.setenv(agent.SOCKET_ENV, path)
+    monkeypatch.setenv("PYTHONPATH", ROOT)
+    pid = delegate("ping")["pid"]
+    try:
+        assert pid != os.getpid()
+        assert delegate("ping")["pid"] == pid
+    finally:
+        call("shutdown", path=path)
+
+
+def test_delegate_falls_back_when_the_agent_cannot_start(tmp_path, monkeypatch):
+    monkeypatch.setenv(agent.AGENT_ENV, "1")
+    monkeypatch.setenv(agent.SOCKET_ENV, str(tmp_path / "agent.sock"))
+    monkeypatch.setattr(agent, "start", lambda: (_ for _ in ()).throw(OSError("no agent")))
+    assert delegate("ping") is None
@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from catamaran import artifacts
+from ansible_collections.evgnomon.catamaran.plugins.modules.binary_install import relay_handler
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+
+
+def test_cached_digest_is_memoized(tmp_path, monkeypatch):
+    path = tmp_path / "zcore"
+    path.write_bytes(b"v1")
+    calls = []
+    real = artifacts.file_digest
+    monkeypatch.setattr(artifacts, "file_digest", lambda p: calls.append(p) or real(p))
+    assert artifacts.cached_digest(str(path)) == hashlib.sha256(b"v1").hexdigest()
+    assert artifacts.cached_digest(str(path)) == hashlib.sha256(b"v1").hexdigest()
+    assert len(calls) == 1
+    path.write_bytes(b"v2!")
+    assert artifacts.cached_digest(str(path)) == hashlib.sha256(b"v2!").hexdigest()
+    assert len(calls) == 2
+
+
+def test_compressed_copy_is_made_once(tmp_path):
+    path = tmp_path / "zcore"
+    path.write_bytes(b"binary" * 1000)
+    digest = artifacts.cached_digest(str(path))
+    blob = artifacts.compressed(str(path), digest)
+    assert gzip.decompress(open(blob, "rb").read()) == b"binary" * 1000
+    mtime = os.stat(blob).st_mtime_ns
+    assert artifacts.compressed(str(path), digest) == blob
+    assert os.stat(blob).st_mtime_ns == mtime
+
+
+def test_relay_fallback(monkeypatch):
+    assert artifacts.wait_relay("abc", "fra1", timeout=0, ttl=60) is None
+    artifacts.publish_relay("abc", "fra1", "10.0.0.2", "secret")
+    assert artifacts.wait_relay("abc", "fra1", timeout=0, ttl=60) == {
+        "address": "10.0.0.2",
+        "token": "secret",
+    }
+    assert artifacts.wait_relay("abc", "nbg1", timeout=0, ttl=60) is None
+    # Relays older than their TTL stopped serving.
+    now = time.time()
+    monkeypatch.setattr(artifacts.time, "time", lambda: now + 120)
+    assert artifacts.wait_relay("abc", "fra1", timeout=0, ttl=60) is None
+
+
+def test_relay_serves_only_the_artifact(tmp_path):
+    blob = tmp_path / "abc.gz"
+    blob.write_bytes(b"payload")
+    (tmp_path / "other.gz").write_bytes(b"other")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), relay_handler(str(blob), "secret"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert urllib.request.urlopen(f"{base}/secret/abc.gz").read() == b"payload"
+        for path in ("/", "/abc.gz", "/secret/", "/secret/other.gz", "/wrong/abc.gz"):
+            with pytest.raises(urllib.error.HTTPError) as e:
+                urllib.request.urlopen(base + path)
+            assert e.value.code == 404
+    finally:
+        server.shutdown()
@@ -0,0 +1,25 @@
+import socket
+
+from catamaran.bootstrap import split_endpoint, wait_for_endpoints
+
+
+def test_split_endpoint():
+    assert split_endpoint("shard-a.x:3306") == ("shard-a.x", 3306)
+    assert split_endpoint("shard-a.x", 22) == ("shard-a.x", 22)
+
+
+def test_wait_for_endpoints():
+    listening = socket.socket()
+    listening.bind(("127.0.0.1", 0))
+    listening.listen()
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    up = f"127.0.0.1:{listening.getsockname()[1]}"
+    down = f"127.0.0.1:{closed.getsockname()[1]}"
+    try:
+        result = wait_for_endpoints([up, down, up], timeout=0.2, interval=0.05)
+    finally:
+        listening.close()
+        closed.close()
+    assert list(result.ready) == [up]
+    assert result.pending == [down]
@@ -0,0 +1,29 @@
+import time
+
+from catamaran.factcache import FactCache
+
+
+def test_fresh_and_stale_hosts(tmp_path):
+    cache = FactCache(str(tmp_path / "facts.db"), ttl=60)
+    cache.set("s1_shard-a.example.com", {"ansible_facts": {"os_family": "Debian"}})
+    cache.set("shard-b.example.com", {}, ttl=1)
+    cache._conn.execute("UPDATE facts SET updated_at = ?", (time.time() - 10,))
+
+    assert cache.get("s1_shard-a.example.com") == {
+        "ansible_facts": {"os_family": "Debian"}
+    }
+    assert cache.get("shard-b.example.com") is None
+    assert cache.stale(["shard-a.example.com", "shard-b.example.com"]) == [
+        "shard-b.example.com"
+    ]
+
+
+def test_invalidate_reprovisioned_host(tmp_path):
+    cache = FactCache(str(tmp_path), ttl=0)
+    cache.set("s1_shard-a.example.com", {})
+    cache.set_ttl(["shard-a.example.com"], 5)
+    cache.set("s1_shard-a.example.com", {"changed": True})
+
+    assert cache._conn.execute("SELECT ttl FROM facts").fetchone() == (5.0,)
+    assert cache.invalidate(["shard-a.example.com"]) == ["s1_shard-a.example.com"]
+    assert cache.keys() == []
@@ -0,0 +1,138 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+
+from catamaran.ghcr import ImageIndex, PAGE_SIZE, delete_image, sync
+
+
+def version(i, tags=()):
+    when = datetime.fromtimestamp(1_700_000_000 + i * 60, timezone.utc).isoformat()
+    return {
+        "id": i,
+        "name": f"sha256:{i:064x}",
+        "created_at": when,
+        "updated_at": when,
+        "metadata": {"container": {"tags": list(tags)}},
+    }
+
+
+class FakeGithub:
+    def __init__(self, count):
+        self.versions = [version(i, [f"v{i}"] if i % 2 else []) for i in range(1, count + 1)]
+        self.requests = []
+
+    def etag(self):
+        return f'"{len(self.versions)}"'
+
+    def handler(self, request):
+        self.requests.append(request)
+        path = request.url.path
+        if path == "/users/evg":
+            return httpx.Response(200, json={"type": "User"})
+        if path == "/token":
+            return httpx.Response(200, json={"token": "t"})
+        if path.startswith("/v2/"):
+            return httpx.Response(200, json={"config": {"size": 10}, "layers": [{"size": 90}]})
+        if "/versions/" in path:
+            version_id = int(path.rsplit("/", 1)[1])
+            found = [v for v in self.versions if v["id"] == version_id]
+            if not found:
+                return httpx.Response(404)
+            return httpx.Response(204 if request.method == "DELETE" else 200, json=found[0])
+        if path.endswith("/versions"):
+            if request.headers.get("if-none-match") == self.etag():
+                return httpx.Response(304)
+            page = int(request.url.params.get("page", 1))
+            newest = sorted(self.versions, key=lambda v: -v["id"])
+            last = (len(newest) - 1) // PAGE_SIZE + 1
+            return httpx.Response(
+                200,
+                json=newest[(page - 1) * PAGE_SIZE : page * PAGE_SIZE],
+                headers={
+                    "etag": self.etag(),
+                    "link": f'<https://api.github.com{path}?per_page=100&page={last}>; rel="last"',
+                },
+            )
+        return httpx.Response(404)
+
+    def pages(self):
+        return sum(r.url.path.endswith("/versions") for r in self.requests)
+
+
+def run_sync(index, gh, **kwargs):
+    return asyncio.run(
+        sync(index, ["evg/ark"], transport=httpx.MockTransport(gh.handler), **kwargs)
+    )[0]
+
+
+def test_incremental_sync(tmp_path):
+    index = ImageIndex(str(tmp_path / "ghcr.db"))
+    gh = FakeGithub(250)
+    report = run_sync(index, gh)
+    assert (report.pages, report.versions, report.sized) == (3, 250, 250)
+
+    gh.requests.clear()
+    assert run_sync(index, gh).not_modified
+    assert gh.pages() == 1
+
+    # A new version takes the tag of an old one, only the first page is read.
+    gh.versions.append(version(251, ["v1", "latest"]))
+    gh.requests.clear()
+    report = run_sync(index, gh, sizes=False)
+    assert (report.pages, report.versions) == (1, 1)
+    assert index.find("evg", "ark", "v1") == 251
+    assert index.find("evg", "ark", "sha256:" + f"{3:064x}") == 3
+
+
+def test_full_sync_drops_deleted_versions(tmp_path):
+    index = ImageIndex(str(tmp_path / "ghcr.db"))
+    gh = FakeGithub(120)
+    run_sync(index, gh, sizes=False)
+    gh.versions = gh.versions[10:]
+    report = run_sync(index, gh, full=True, sizes=False)
+    assert report.pruned == 10
+    assert index.find("evg", "ark", "v1") is None
+
+
+def test_query(tmp_path):
+    index = ImageIndex(str(tmp_path / "ghcr.db"))
+    run_sync(index, FakeGithub(10))
+    assert [r["id"] for r in index.query(tag="v1*")] == [1]
+    assert [r["id"] for r in index.query(untagged=True)] == [10, 8, 6, 4, 2]
+    old = index.query(package="ark", before=1_700_000_000 + 3 * 60)
+    assert [(r["id"], r["tags"], r["size"]) for r in old] == [(2, [], 100), (1, ["v1"], 100)]
+
+
+def delete(index, gh, monkeypatch, tag):
+    gh.requests.clear()
+    transport = httpx.MockTransport(gh.handler)
+    real = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda **kw: real(transport=transport, **kw))
+    asyncio.run(delete_image(tag, "ark", "evg", "token", index=index))
+    return [(r.method, r.url.path) for r in gh.requests]
+
+
+def test_delete_uses_the_index(tmp_path, monkeypatch):
+    index = ImageIndex(str(tmp_path / "ghcr.db"))
+    gh = FakeGithub(3)
+    run_sync(index, gh, sizes=False)
+    assert delete(index, gh, monkeypatch, "v3") == [
+        ("GET", "/users/evg/packages/container/ark/versions/3"),
+        ("DELETE", "/users/evg/packages/container/ark/versions/3"),
+    ]
+    assert index.find("evg", "ark", "v3") is None
+
+
+def test_delete_rechecks_a_moved_tag(tmp_path, monkeypatch):
+    index = ImageIndex(str(tmp_path / "ghcr.db"))
+    gh = FakeGithub(3)
+    run_sync(index, gh, sizes=False)
+    # v3 moved to a new version after the last sync.
+    gh.versions[2]["metadata"]["container"]["tags"] = []
+    gh.versions.append(version(4, ["v3"]))
+    assert delete(index, gh, monkeypatch, "v3") == [
+        ("GET", "/users/evg/packages/container/ark/versions/3"),
+        ("GET", "/users/evg/packages/container/ark/versions"),
+        ("DELETE", "/users/evg/packages/container/ark/versions/4"),
+    ]
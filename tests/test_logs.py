@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+
+from catamaran.logs import CHUNK_SIZE, Query, index_segment, line_time, parse_time, query_logs
+
+
+def record(ts, host, message):
+    """A journal record as the receiver's file output writes it."""
+    return json.dumps(
+        {
+            "PRIORITY": "6",
+            "_HOSTNAME": host,
+            "SYSLOG_IDENTIFIER": "kernel",
+            "MESSAGE": message,
+            "time": ts,
+        },
+        separators=(",", ":"),
+    ).encode() + b"\n"
+
+
+def write_store(root):
+    hourly = root / "hosts" / "shard-a.x"
+    hourly.mkdir(parents=True)
+    with open(hourly / "2026010100.log.gz", "wb") as f:
+        f.write(gzip.compress(record(100, "shard-a.x", "boot") + record(110, "shard-a.x", "ready")))
+        f.write(gzip.compress(record(200, "shard-a.x", "oom killed")))
+    (root / "hosts" / "node.shard-b.x").write_bytes(
+        record(150, "shard-b.x", "oom killed") + record(300, "shard-b.x", "ok")
+    )
+    (root / "all-logs.log").write_bytes(record(250, "shard-c.x", "oom killed"))
+
+
+def test_parse_time():
+    assert parse_time("1970-01-01T00:01:40") == 100
+    assert parse_time("2026-01-01T00:00:00+00:00") - parse_time("1d") < 0
+
+
+def test_line_time():
+    assert line_time(record(1760000000.123456, "shard-a.x", "boot")) == 1760000000.123456
+    assert line_time(record(1.7e9, "shard-a.x", 'set "time": 5')) == 1.7e9
+    assert line_time(b'{"MESSAGE":"no time"}') is None
+
+
+def test_index_per_gzip_member(tmp_path):
+    write_store(tmp_path)
+    path = str(tmp_path / "hosts" / "shard-a.x" / "2026010100.log.gz")
+    segment = index_segment(path, "shard-a.x")
+    assert [(b.start, b.end) for b in segment.blocks] == [(100, 110), (200, 200)]
+    assert os.path.exists(path + ".idx")
+
+
+def test_index_is_extended_incrementally(tmp_path):
+    write_store(tmp_path)
+    path = str(tmp_path / "all-logs.log")
+    assert index_segment(path, None).blocks[0].hosts == ["shard-c.x"]
+    with open(path, "ab") as f:
+        f.write(record(260, "shard-d.x", "late") + b'{"partial"')
+    blocks = index_segment(path, None).blocks
+    assert [b.hosts for b in blocks] == [["shard-c.x"], ["shard-d.x"]]
+
+
+def test_query_logs(tmp_path):
+    write_store(tmp_path)
+    found = query_logs(str(tmp_path), Query(grep=b"oom"), workers=2)
+    assert [ts for ts, _ in found] == [150, 200, 250]
+    found = query_logs(str(tmp_path), Query(since=140, until=250, hosts={"shard-a.x", "shard-b.x"}), workers=2)
+    assert [ts for ts, _ in found] == [150, 200]
+
+
+def test_index_gzip_member_larger_than_a_read(tmp_path):
+    big = b"".join(record(1000 + i, "shard-a.x", os.urandom(64).hex()) for i in range(20000))
+    path = tmp_path / "hosts" / "shard-a.x" / "2026010101.log.gz"
+    path.parent.mkdir(parents=True)
+    first = gzip.compress(big, compresslevel=1)
+    assert len(first) > CHUNK_SIZE
+    path.write_bytes(first + gzip.compress(record(30000, "shard-a.x", "oom killed")))
+    blocks = index_segment(str(path), "shard-a.x").blocks
+    assert [(b.offset, b.length) for b in blocks][0] == (0, len(first))
+    assert blocks[1].offset == len(first)
+    found = query_logs(str(tmp_path), Query(grep=b"oom"), workers=1)
+    assert [ts for ts, _ in found] == [30000]
@@ -1,5 +1,5 @@
 from typer.testing import CliRunner
-from catamaran import app
+from catamaran.cli import app
 
 runner = CliRunner()
 
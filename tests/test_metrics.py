@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from catamaran.ansible import AnsibleResult, instrument
+from catamaran.metrics import Metrics
+
+
+def test_phases_accumulate():
+    metrics = Metrics()
+    for _ in range(2):
+        with metrics.phase("upload"):
+            pass
+    metrics.count("uploaded_bytes", 10)
+    metrics.count("uploaded_bytes", 5)
+    data = metrics.to_dict()
+    assert data["phases"]["upload"]["count"] == 2
+    assert data["counters"] == {"uploaded_bytes": 15}
+    assert data["max_rss_bytes"] > 0
+
+
+def test_open_phase_is_reported():
+    metrics = Metrics()
+    with metrics.phase("build"):
+        assert metrics.to_dict()["phases"]["build"]["count"] == 1
+    assert metrics.to_dict()["phases"]["build"]["count"] == 1
+
+
+def test_write_appends_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv("CATAMARAN_METRICS_FILE", str(path))
+    Metrics().write("gh_image")
+    Metrics().write("pkg_release", failed=True)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line["task"], line["failed"]) for line in lines] == [
+        ("gh_image", False),
+        ("pkg_release", True),
+    ]
+
+
+def test_write_without_file(monkeypatch):
+    monkeypatch.delenv("CATAMARAN_METRICS_FILE", raising=False)
+    assert Metrics().write("gh_image") is None
+
+
+class FakeModule:
+    _name = "evgnomon.catamaran.gh_image"
+
+    def exit_json(self, **kwargs):
+        raise SystemExit(kwargs)
+
+    def fail_json(self, **kwargs):
+        raise SystemExit(kwargs)
+
+
+def test_instrument_attaches_metrics_to_failures(tmp_path, monkeypatch):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv("CATAMARAN_METRICS_FILE", str(path))
+    module = FakeModule()
+    result = AnsibleResult()
+    metrics = instrument(module, result.metrics)
+    with pytest.raises(SystemExit) as e:
+        with metrics.phase("login"):
+            module.fail_json(msg="denied")
+    assert e.value.code["metrics"]["phases"]["login"]["count"] == 1
+    line = json.loads(path.read_text())
+    assert line["task"] == "gh_image" and line["failed"]
+    assert "metrics" in result.to_dict()
@@ -0,0 +1,21 @@
+from catamaran.registry import image_registry, pull
+
+
+class FakeClient:
+    def pull(self, image, stream, decode, auth_config):
+        yield {"status": "Pulling from library/redis", "id": "7.0.11"}
+        yield {"status": "Downloading", "id": "a", "progressDetail": {"current": 1, "total": 100}}
+        yield {"status": "Downloading", "id": "a", "progressDetail": {"current": 100, "total": 100}}
+        yield {"status": "Downloading", "id": "b", "progressDetail": {"current": 5, "total": 50}}
+        yield {"status": "Pull complete", "id": "b", "progressDetail": {}}
+
+
+def test_image_registry():
+    assert image_registry("mysql:8.0.33") == "docker.io"
+    assert image_registry("evgnomon/ark:main") == "docker.io"
+    assert image_registry("ghcr.io/evgnomon/ark:main") == "ghcr.io"
+    assert image_registry("localhost:5000/ark") == "localhost:5000"
+
+
+def test_pull_counts_layer_bytes():
+    assert pull(FakeClient(), "redis:7.0.11") == 150
@@ -0,0 +1,46 @@
+import hashlib
+
+import httpx
+
+from catamaran.releases import ReleaseFetcher, match_asset
+
+BINARY = b"zygote binary"
+ASSETS = [
+    {"id": 1, "name": "zygote-linux-amd64", "url": "https://api.github.com/assets/1"},
+    {"id": 2, "name": "zygote-linux-arm64", "url": "https://api.github.com/assets/2"},
+    {"id": 3, "name": "zygote-darwin-amd64", "url": "https://api.github.com/assets/3"},
+]
+ASSETS[0]["digest"] = f"sha256:{hashlib.sha256(BINARY).hexdigest()}"
+
+
+def test_match_asset():
+    assert match_asset(ASSETS, ["zygote-", "linux", "arm64"])["id"] == 2
+    assert match_asset(ASSETS, ["amd64", "^darwin"])["id"] == 1
+
+
+def test_fetch_skips_download_when_nothing_released(tmp_path):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/releases/latest"):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(
+                200, json={"tag_name": "v1", "assets": ASSETS}, headers={"ETag": '"v1"'}
+            )
+        return httpx.Response(200, content=BINARY)
+
+    client = httpx.Client(
+        base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+    )
+    fetcher = ReleaseFetcher(cache_dir=str(tmp_path / "cache"), client=client)
+    dest = str(tmp_path / "bin" / "zygote")
+
+    first = fetcher.fetch("evgnomon/zygote", ["linux", "amd64"], dest)
+    second = fetcher.fetch("evgnomon/zygote", ["linux", "amd64"], dest)
+
+    assert first.downloaded and first.installed
+    assert not second.downloaded and not second.installed
+    assert calls.count("/assets/1") == 1
+    assert open(dest, "rb").read() == BINARY
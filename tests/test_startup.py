@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY = ("typer", "httpx", "docker")
+
+
+def loaded(code):
+    out = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sorted(sys.modules)))"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return {m for m in HEAVY if m in out}
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import catamaran",
+        "import catamaran.topology",
+        "from catamaran.ghcr import delete_image",
+        "import catamaran.github, catamaran.ansible, catamaran.textfile",
+        "import catamaran.releases, catamaran.logs",
+    ],
+)
+def test_submodules_do_not_import_heavy_dependencies(code):
+    assert loaded(code) == set()
+
+
+def test_lazy_package_names():
+    assert loaded("from catamaran import delete_image") == set()
+    assert "typer" in loaded("from catamaran import app")
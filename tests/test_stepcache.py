@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from catamaran.stepcache import Step, StepCache, expand, run_step, run_steps
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+
+
+def workspace(tmp_path):
+    ws = tmp_path / "ws"
+    (ws / "src").mkdir(parents=True)
+    (ws / ".git").mkdir()
+    (ws / "src" / "main.c").write_text("int main;")
+    (ws / ".git" / "HEAD").write_text("ref")
+    return str(ws)
+
+
+def test_expand_prunes_excluded_trees(tmp_path):
+    ws = workspace(tmp_path)
+    assert expand(ws, ["*", "!.git/*"]) == ["src/main.c"]
+    assert expand(ws, ["*.c"]) == ["src/main.c"]
+
+
+def test_outputs_are_restored_on_hit(tmp_path, monkeypatch):
+    ws = workspace(tmp_path)
+    cache = StepCache(str(tmp_path / "cache"))
+    step = Step(
+        name="build",
+        command="mkdir -p dist && cat src/main.c > dist/out && echo ran >> log",
+        inputs=["src/*"],
+        outputs=["dist/*"],
+        env=["CATAMARAN_TEST_FLAG"],
+    )
+    first = run_step(step, ws, cache)
+    assert (first.hit, first.rc, first.files) == (False, 0, 1)
+
+    os.remove(os.path.join(ws, "dist", "out"))
+    second = run_step(step, ws, cache)
+    assert second.hit and second.key == first.key
+    assert open(os.path.join(ws, "dist", "out")).read() == "int main;"
+    assert open(os.path.join(ws, "log")).read() == "ran\n"
+
+    monkeypatch.setenv("CATAMARAN_TEST_FLAG", "1")
+    assert not run_step(step, ws, cache).hit
+
+
+def test_failed_steps_are_not_cached(tmp_path):
+    ws = workspace(tmp_path)
+    cache = StepCache(str(tmp_path / "cache"))
+    steps = [Step(name="check", command="exit 3"), Step(name="build", command="true")]
+    assert [r.rc for r in run_steps(steps, ws, cache, parallel=False)] == [3]
+    assert [r.hit for r in run_steps(steps, ws, cache)] == [False, False]
+    assert [r.hit for r in run_steps(steps, ws, cache)] == [False, True]
+
+
+def test_earlier_hits_run_again_when_a_later_step_misses(tmp_path):
+    ws = workspace(tmp_path)
+    cache = StepCache(str(tmp_path / "cache"))
+    steps = [
+        # Installs dependencies the build reads but does not cache.
+        Step(name="check", command="mkdir -p deps && echo lib > deps/lib && echo ran >> log", inputs=["src/*"]),
+        Step(
+            name="build",
+            command="mkdir -p dist && cat deps/lib src/main.c > dist/out",
+            inputs=["src/*", "files/build"],
+            outputs=["dist/*"],
+        ),
+    ]
+    assert [r.rc for r in run_steps(steps, ws, cache, parallel=False)] == [0, 0]
+    assert [r.hit for r in run_steps(steps, ws, cache, parallel=False)] == [True, True]
+
+    # A clean workspace with a change only the build step reads.
+    for path in ("deps/lib", "dist/out"):
+        os.remove(os.path.join(ws, path))
+    os.makedirs(os.path.join(ws, "files"))
+    open(os.path.join(ws, "files", "build"), "w").write("v2")
+    reports = run_steps(steps, ws, cache, parallel=False)
+    assert [(r.hit, r.rc) for r in reports] == [(False, 0), (False, 0)]
+    assert open(os.path.join(ws, "dist", "out")).read() == "lib\nint main;"
+    assert open(os.path.join(ws, "log")).read() == "ran\nran\n"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    ws = workspace(tmp_path)
+    cache = StepCache(str(tmp_path / "cache"), max_size=1500)
+    steps = [
+        Step(name=n, command=f"head -c 1000 /dev/urandom > {n}.bin", outputs=[f"{n}.bin"])
+        for n in ("a", "b")
+    ]
+    run_step(steps[0], ws, cache)
+    run_step(steps[1], ws, cache)
+    assert len(os.listdir(tmp_path / "cache" / "blobs")) == 1
+    assert run_step(steps[1], ws, cache).hit
+    assert not run_step(steps[0], ws, cache).hit
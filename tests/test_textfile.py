@@ -0,0 +1,24 @@
+import pytest
+
+from catamaran.textfile import recorded, write_run
+
+
+def test_write_run(tmp_path):
+    path = write_run("gh_image", 1.5, True, {"image": 'a"b'}, str(tmp_path))
+    text = open(path).read()
+    assert path.endswith("catamaran_gh_image.prom")
+    assert 'catamaran_task_duration_seconds{task="gh_image",image="a\\"b"} 1.5' in text
+    assert 'catamaran_task_success{task="gh_image",image="a\\"b"} 1' in text
+
+
+def test_write_run_without_collector_directory(tmp_path):
+    assert write_run("gh_image", 1, True, directory=str(tmp_path / "missing")) is None
+
+
+def test_recorded_module_exit(tmp_path, monkeypatch):
+    monkeypatch.setenv("CATAMARAN_TEXTFILE_DIR", str(tmp_path))
+    with pytest.raises(SystemExit):
+        with recorded("pkg_release"):
+            raise SystemExit(1)
+    text = (tmp_path / "catamaran_pkg_release.prom").read_text()
+    assert 'catamaran_task_success{task="pkg_release"} 0' in text
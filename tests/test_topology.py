@@ -0,0 +1,43 @@
+from catamaran.topology import bucket_owners, parse_node, plan_shards, rolling_batches
+
+
+def test_parse_node():
+    assert parse_node("shard-b-2.example.com") == ("shard", "b", 2)
+    assert parse_node("shard-a.example.com") == ("shard", "a", 0)
+
+
+def test_rolling_batches_by_replica_group():
+    hosts = [
+        "shard-a.x",
+        "shard-b.x",
+        "shard-a-1.x",
+        "shard-b-1.x",
+        "shard-a-2.x",
+    ]
+    assert rolling_batches(hosts) == [
+        ["shard-a.x", "shard-a-1.x", "shard-a-2.x"],
+        ["shard-b.x", "shard-b-1.x"],
+    ]
+    assert rolling_batches(hosts, 2) == [
+        ["shard-a.x", "shard-a-1.x"],
+        ["shard-a-2.x"],
+        ["shard-b.x", "shard-b-1.x"],
+    ]
+
+
+def test_growing_shards_only_moves_buckets_to_the_new_shard():
+    old = bucket_owners(3)
+    new = bucket_owners(4)
+    moved = [(a, b) for a, b in zip(old, new) if a != b]
+    assert moved and all(b == 3 for _, b in moved)
+
+    plan = plan_shards("zygote.run", 4, 2, previous_num_shards=3)
+    assert plan.moved_buckets == len(moved)
+    assert plan.hosts["shard-b-3.zygote.run"].action == "join"
+    assert plan.hosts["shard-a.zygote.run"].action == "rebalance"
+
+
+def test_unchanged_shard_count_keeps_every_host():
+    plan = plan_shards("zygote.run", 3, 3, previous_num_shards=3)
+    assert plan.moved_buckets == 0
+    assert {h.action for h in plan.hosts.values()} == {"keep"}
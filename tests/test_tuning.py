@@ -0,0 +1,60 @@
+import pytest
+
+from catamaran.tuning import parse_state, state_changes, tuning_profile
+
+PROFILES = {
+    "default": {
+        "sysctls": {"net.core.somaxconn": 4096, "net.ipv4.tcp_tw_reuse": 1},
+        "nofile_soft": 65536,
+        "thp": "",
+    },
+    "shard": {
+        "extends": "default",
+        "sysctls": {"net.core.somaxconn": 65535},
+        "thp": "never",
+    },
+}
+
+
+def test_profiles_extend_and_merge_sysctls():
+    shard = tuning_profile(PROFILES, "shard", {"sysctls": {"vm.swappiness": 1}})
+    assert shard["sysctls"] == {
+        "net.core.somaxconn": 65535,
+        "net.ipv4.tcp_tw_reuse": 1,
+        "vm.swappiness": 1,
+    }
+    assert (shard["nofile_soft"], shard["thp"]) == (65536, "never")
+    assert "extends" not in shard
+    with pytest.raises(ValueError):
+        tuning_profile(PROFILES, "redis")
+    with pytest.raises(ValueError):
+        tuning_profile({"a": {"extends": "a"}}, "a")
+
+
+def test_overrides_apply_last():
+    shard = tuning_profile(
+        PROFILES,
+        "shard",
+        {"sysctls": {"net.core.somaxconn": 1024, "net.ipv4.tcp_tw_reuse": 0}, "nofile_soft": 99, "thp": "madvise"},
+    )
+    assert shard["sysctls"] == {"net.core.somaxconn": 1024, "net.ipv4.tcp_tw_reuse": 0}
+    assert (shard["nofile_soft"], shard["thp"]) == (99, "madvise")
+
+
+def test_state_changes():
+    before = parse_state(
+        [
+            "net.ipv4.ip_local_port_range=32768\t60999",
+            "transparent_hugepage.enabled=always [madvise] never",
+            "net.core.somaxconn=4096",
+            "garbage",
+        ]
+    )
+    assert before == {
+        "net.ipv4.ip_local_port_range": "32768 60999",
+        "transparent_hugepage.enabled": "madvise",
+        "net.core.somaxconn": "4096",
+    }
+    after = dict(before, **{"transparent_hugepage.enabled": "never"})
+    assert state_changes(before, after) == ["transparent_hugepage.enabled: madvise -> never"]
+    assert state_changes(after, after) == []
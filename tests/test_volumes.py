@@ -0,0 +1,43 @@
+import pytest
+
+from catamaran.volumes import udev_match, volume_plan
+
+PROFILES = {
+    "default": {"mount_opts": {"ext4": "defaults"}},
+    "database": {
+        "mkfs_opts": {"ext4": "-m 0", "xfs": "-i size=512"},
+        "mount_opts": {"ext4": "noatime,commit=30", "xfs": "noatime"},
+        "readahead_kb": 16,
+        "scheduler": "none",
+        "fstrim": True,
+    },
+}
+
+
+def test_udev_match():
+    assert udev_match("/dev/sdb") == 'KERNEL=="sdb"'
+    assert (
+        udev_match("/dev/disk/by-id/scsi-0DO_Volume_db")
+        == 'SYMLINK=="disk/by-id/scsi-0DO_Volume_db"'
+    )
+
+
+def test_volume_plan_resolves_profiles_per_filesystem():
+    plan = volume_plan(
+        {"logs": "/dev/sdc", "db": "/dev/sdb"},
+        [{"name": "db", "profile": "database", "filesystem": "xfs"}],
+        PROFILES,
+    )
+    assert [v["name"] for v in plan] == ["db", "logs"]
+    db, logs = plan
+    assert db["mount_point"] == "/mnt/db"
+    assert (db["mkfs_opts"], db["mount_opts"]) == ("-i size=512", "noatime")
+    assert (db["readahead_kb"], db["scheduler"], db["fstrim"]) == (16, "none", True)
+    assert logs["profile"] == "default"
+    assert (logs["mkfs_opts"], logs["mount_opts"]) == ("", "defaults")
+    assert logs["scheduler"] is None
+
+
+def test_volume_plan_rejects_unknown_profile():
+    with pytest.raises(ValueError):
+        volume_plan({"db": "/dev/sdb"}, [{"name": "db", "profile": "fast"}], PROFILES)